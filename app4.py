@@ -1,23 +1,1250 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List
+import asyncio
+import base64
+import fcntl
+import gc
+import hashlib
+import json
+import math
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
 import time
+import tracemalloc
+import zlib
 
-app = FastAPI()
+# Configuration
+LEAN = os.environ.get("LEAN", "0") == "1"                     # Perfil de memoria minima por replica (tabelas/caches pequenas, gc.freeze)
+MEMORY_BUDGET_MB = float(os.environ.get("MEMORY_BUDGET_MB", "0"))  # Orcamento de RSS por replica reportado em /debug/memory (0 = sem orcamento)
+TRACEMALLOC_FRAMES = int(os.environ.get("TRACEMALLOC_FRAMES", "0"))  # >0 liga o tracemalloc (com custo) para ver os maiores alocadores
+FIB_MAX_N = int(os.environ.get("FIB_MAX_N", "20000"))        # Maior n aceite; acima de ~20000 o decimal em JSON excede o limite int->str (usar encoding ou stream)
+FIB_TABLE_SIZE = int(os.environ.get("FIB_TABLE_SIZE", "64" if LEAN else "256"))  # Valores pequenos pre-calculados no arranque
+DEFAULT_N = 10
+ENCODINGS = ("decimal", "hex", "base64", "digits", "mod")                 # Formatos de fibonacci_result
+DECIMAL_CHUNK_DIGITS = 4000                                                # Digitos por bloco no stream decimal (abaixo do limite int->str)
+# O Python recusa converter para decimal inteiros com mais digitos do que isto
+DECIMAL_JSON_MAX_DIGITS = sys.get_int_max_str_digits() if hasattr(sys, "get_int_max_str_digits") else 0
+FIB_BATCH_MAX = int(os.environ.get("FIB_BATCH_MAX", "1000"))  # Maximo de valores por pedido em /fib/batch
+CACHE_CAPACITY = int(os.environ.get("CACHE_CAPACITY", "128" if LEAN else "1024"))  # Entradas na cache LRU (0 desliga a cache)
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str((8 if LEAN else 64) * 1024 * 1024)))  # Tamanho maximo (estimado) da LRU; um batch grande ocupa ~2 MB
+CACHE_TTL_SEC = float(os.environ.get("CACHE_TTL_SEC", "0"))     # Validade de cada entrada (0 = sem expiracao)
+SHARED_CACHE_SLOTS = int(os.environ.get("SHARED_CACHE_SLOTS", "0"))         # >0 troca a LRU local por uma cache partilhada entre workers
+SHARED_CACHE_SLOT_BYTES = int(os.environ.get("SHARED_CACHE_SLOT_BYTES", "4096"))  # Resultados maiores que o slot nao sao guardados
+SHARED_CACHE_PATH = os.environ.get(
+    "SHARED_CACHE_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "fib4-cache"))
+COALESCE = os.environ.get("COALESCE", "1") == "1"                # Pedidos iguais em simultaneo partilham um so calculo
+ADMISSION_LIMIT = int(os.environ.get("ADMISSION_LIMIT", "50"))            # Pedidos em execucao por pod; igual ao target do KPA (0 desliga)
+ADMISSION_QUEUE = int(os.environ.get("ADMISSION_QUEUE", "50"))            # Pedidos em espera antes de responder 503
+ADMISSION_TIMEOUT_SEC = float(os.environ.get("ADMISSION_TIMEOUT_SEC", "2"))  # Espera maxima na fila (0 = sem limite)
+RETRY_AFTER_SEC = int(os.environ.get("RETRY_AFTER_SEC", "1"))
+ADMISSION_PATHS = ("/fib", "/work")                                        # So os pedidos de calculo passam pelo limitador
+OFFLOAD_MODE = os.environ.get("OFFLOAD_MODE", "none")                     # none | thread | process
+# Limiares de custo para sair do event loop. Medido com o fast doubling: F(5000) ~25 us,
+# F(20000) ~0.15 ms, F(80000) ~1.2 ms; um salto para o thread pool custa ~60 us e um
+# process pool ainda paga o pickle do resultado. So compensa acima de ~1 ms de calculo,
+# por isso com FIB_MAX_N=20000 um /fib nunca sai do loop. Num batch o custo cresce com
+# len(n) * max(n): 1000 valores perto de 20000 (2e7) demoram ~1.5 ms, 500 (1e7) ~0.65 ms.
+OFFLOAD_MIN_N = int(os.environ.get("OFFLOAD_MIN_N", "80000"))              # /fib com n acima disto sai do event loop (~1 ms)
+OFFLOAD_MIN_BATCH_WORK = int(os.environ.get("OFFLOAD_MIN_BATCH_WORK", "15000000"))  # /fib/batch com len(n) * max(n) acima disto (~1 ms)
+POOL_SIZE = int(os.environ.get("POOL_SIZE", "0"))                          # 0 = derivado do limite de CPU do container
+WORK_KERNEL = os.environ.get("WORK_KERNEL", "cpu")                         # Kernel usado por /work quando o pedido nao indica nenhum
+WORK_AMOUNT = float(os.environ.get("WORK_AMOUNT", "10"))                  # Quantidade por omissao, nas unidades do kernel
+# Limite de quantidade por kernel: ms de CPU, lado da matriz, MB tocados, ms de espera
+WORK_MAX_AMOUNT = {"cpu": 10000, "matmul": 2000, "memory": 1024, "io": 60000}
+PAGE_SIZE = 4096
+LOAD_PANIC_WINDOW_SEC = int(os.environ.get("LOAD_PANIC_WINDOW_SEC", "6"))     # Janelas do KPA: panic = 10% da stable
+LOAD_STABLE_WINDOW_SEC = int(os.environ.get("LOAD_STABLE_WINDOW_SEC", "60"))
+POD_NAME = os.environ.get("POD_NAME") or os.environ.get("HOSTNAME", "local")  # No Kubernetes o hostname e o nome do pod
+PROCESS_START = time.monotonic()
+ENABLE_DOCS = os.environ.get("ENABLE_DOCS", "0" if LEAN else "1") == "1"  # 0 desliga /docs e /openapi.json no modo de arranque rapido
+# Pedidos feitos em processo no arranque, antes de o pod ficar pronto
+WARMUP_REQUESTS = [
+    ("/fib", f"n={DEFAULT_N}"),
+    ("/fib", f"n={FIB_TABLE_SIZE + 1}"),
+    ("/fib/batch", "n=1&n=2"),
+    ("/work", "kernel=cpu&amount=0"),
+    ("/cache/stats", ""),
+    ("/metrics", ""),
+]
 
-def calculate_fibonacci(n: int):
+if TRACEMALLOC_FRAMES > 0:
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+# Buckets em segundos: de 0.5 ms (pedidos em cache) ate 10 s (timeout dos clientes)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUESTS_TOTAL = Counter("fib_requests_total", "HTTP requests handled", ["method", "path", "status"])
+REQUEST_DURATION = Histogram("fib_request_duration_seconds", "Server-side request duration", ["path"], buckets=LATENCY_BUCKETS)
+COMPUTE_DURATION = Histogram("fib_compute_duration_seconds", "Time spent computing results", ["path"], buckets=LATENCY_BUCKETS)
+REQUESTS_IN_FLIGHT = Gauge("fib_requests_in_flight", "Requests currently being handled")
+ADMISSION_WAIT = Histogram("fib_admission_wait_seconds", "Time admitted requests waited for a slot", buckets=LATENCY_BUCKETS)
+REQUESTS_SHED = Counter("fib_requests_shed_total", "Requests rejected with 503 by admission control", ["reason"])
+GC_PAUSE = Histogram("fib_gc_pause_seconds", "Garbage collector pause per collection", ["generation"],
+                     buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1))
+POOL_QUEUE_WAIT = Histogram("fib_pool_queue_seconds", "Time offloaded computations waited for a pool worker", ["path"], buckets=LATENCY_BUCKETS)
+
+
+async def _asgi_get(path, query_string=""):
+    """Drive one GET through the full ASGI stack in-process and return its status."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(b"host", b"warmup")],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 0),
+        "fib.warmup": True,
+    }
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await app(scope, receive, send)
+    return statuses[0] if statuses else 500
+
+
+def container_cpu_limit():
+    """CPU limit of this container in whole cores (cgroup v2, then v1, then host count)."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, math.ceil(quota / period))
+    except (OSError, ValueError):
+        pass
+    return os.cpu_count() or 1
+
+
+def create_executor(mode, size):
+    if mode == "thread":
+        return ThreadPoolExecutor(max_workers=size, thread_name_prefix="fib-compute")
+    if mode == "process":
+        # Importado so neste modo: o multiprocessing pesa na memoria de cada replica
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # spawn: os workers nao herdam as threads nem o event loop do uvicorn
+        return ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+    if mode != "none":
+        raise ValueError(f"unknown OFFLOAD_MODE {mode!r}")
+    return None
+
+
+executor = None
+
+
+class GCMonitor:
+    """Count collections and pause time per generation through gc.callbacks."""
+
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pause_total = [0.0, 0.0, 0.0]
+        self.pause_max = [0.0, 0.0, 0.0]
+        self._started = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self._started = time.perf_counter()
+            return
+        if self._started is None:
+            return
+        pause = time.perf_counter() - self._started
+        generation = info["generation"]
+        self.collections[generation] += 1
+        self.pause_total[generation] += pause
+        self.pause_max[generation] = max(self.pause_max[generation], pause)
+        GC_PAUSE.labels(str(generation)).observe(pause)
+        self._started = None
+
+    def stats(self):
+        return [
+            {"generation": gen, "collections": self.collections[gen],
+             "pause_total_sec": self.pause_total[gen], "pause_max_sec": self.pause_max[gen]}
+            for gen in range(3)
+        ]
+
+
+gc_monitor = GCMonitor()
+gc.callbacks.append(gc_monitor)
+
+
+def process_memory():
+    """RSS, peak RSS, anon and file RSS in bytes from /proc/self/status.
+
+    Without /proc (not Linux) only the peak is reported, from getrusage.
+    """
+    memory = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:", "RssAnon:", "RssFile:")):
+                    name, value = line.split(":", 1)
+                    memory[name] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+
+        memory["VmHWM"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return {
+        "rss_bytes": memory.get("VmRSS"),
+        "peak_rss_bytes": memory.get("VmHWM"),
+        "anon_bytes": memory.get("RssAnon"),
+        "file_bytes": memory.get("RssFile"),
+    }
+
+
+def _timed_call(fn, *args):
+    # time.monotonic e comum a todos os processos no Linux, por isso os
+    # instantes medidos num worker sao comparaveis com os do event loop
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic()
+
+
+async def run_compute(path, offload, fn, *args, observe=True):
+    """Run fn(*args), on the worker pool when offload is set and a pool exists.
+
+    Returns (result, queue_time, compute_time) so pool queueing is reported
+    apart from the computation itself; observe=False keeps warm-up out of the metrics.
+    """
+    if executor is None or not offload:
+        started = time.monotonic()
+        return fn(*args), 0.0, time.monotonic() - started
+    submitted = time.monotonic()
+    result, started, finished = await asyncio.get_running_loop().run_in_executor(
+        executor, _timed_call, fn, *args)
+    queue_time = started - submitted
+    if observe:
+        POOL_QUEUE_WAIT.labels(path).observe(queue_time)
+    return result, queue_time, finished - started
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global executor
+    pool_size = POOL_SIZE or container_cpu_limit()
+    executor = create_executor(OFFLOAD_MODE, pool_size)
+    if executor is not None:
+        # Arranca todos os workers agora e nao no primeiro pedido pesado
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(executor, calculate_fibonacci, FIB_TABLE_SIZE + 1)
+                               for _ in range(pool_size)))
+    # Aquece routing, validacao, serializacao e os caminhos de codigo importados
+    # preguicosamente, para o primeiro pedido real nao pagar esse custo.
+    for path, query_string in WARMUP_REQUESTS:
+        status = await _asgi_get(path, query_string)
+        if status != 200:
+            raise RuntimeError(f"warm-up request {path}?{query_string} returned {status}")
+    result_cache.reset()
+    single_flight.reset()
+    if LEAN:
+        # Os objetos do arranque passam para a geracao permanente: o GC deixa de os percorrer
+        gc.collect()
+        gc.freeze()
+    app.state.ready = True
+    yield
+    if executor is not None:
+        executor.shutdown(wait=True)
+    if app.state.drain_started is not None:
+        # O uvicorn so corre o shutdown do lifespan depois de fechar as ligacoes em curso
+        print(f"[DRAIN] finished in {time.monotonic() - app.state.drain_started:.3f}s "
+              f"({app.state.in_flight} requests still in flight)", flush=True)
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    docs_url="/docs" if ENABLE_DOCS else None,
+    redoc_url="/redoc" if ENABLE_DOCS else None,
+    openapi_url="/openapi.json" if ENABLE_DOCS else None,
+)
+app.state.ready = False
+app.state.draining = False       # Posto a True pelo serve.py quando recebe SIGTERM
+app.state.drain_started = None
+app.state.in_flight = 0
+
+
+class ConcurrencyTracker:
+    """Time-weighted in-flight concurrency over sliding windows.
+
+    Concurrency is integrated into a ring of short buckets (concurrency x
+    seconds), so the average over any window up to the horizon is the sum
+    of its buckets divided by its length, as the KPA computes its stable
+    and panic averages. Updates are O(1) amortised and run on the event
+    loop only.
+    """
+
+    def __init__(self, horizon, resolution=0.25):
+        self.current = 0
+        self.resolution = resolution
+        self._size = int(math.ceil(horizon / resolution)) + 1
+        self._stamps = [-1] * self._size       # Indice do intervalo a que cada bucket pertence
+        self._area = [0.0] * self._size
+        self._peak = [0] * self._size
+        self._arrivals = [0] * self._size
+        self._last = time.monotonic()
+
+    def _bucket(self, index):
+        slot = index % self._size
+        if self._stamps[slot] != index:
+            self._stamps[slot] = index
+            self._area[slot] = 0.0
+            self._peak[slot] = self.current
+            self._arrivals[slot] = 0
+        return slot
+
+    def _advance(self, now):
+        t = max(self._last, now - self._size * self.resolution)
+        while t < now:
+            index = int(t / self.resolution)
+            end = min((index + 1) * self.resolution, now)
+            self._area[self._bucket(index)] += self.current * (end - t)
+            t = end
+        self._last = now
+
+    def change(self, delta):
+        now = time.monotonic()
+        self._advance(now)
+        self.current += delta
+        slot = self._bucket(int(now / self.resolution))
+        self._peak[slot] = max(self._peak[slot], self.current)
+        if delta > 0:
+            self._arrivals[slot] += delta
+
+    def window(self, seconds):
+        """Return (average concurrency, peak concurrency, arrivals per second) over the last `seconds`."""
+        now = time.monotonic()
+        self._advance(now)
+        start = now - seconds
+        area = arrivals = 0.0
+        peak = self.current
+        for index in range(int(start / self.resolution), int(now / self.resolution) + 1):
+            slot = index % self._size
+            if self._stamps[slot] != index:
+                continue
+            # O bucket mais antigo so conta na parte que cai dentro da janela
+            bucket_start = index * self.resolution
+            covered = min(bucket_start + self.resolution, now) - bucket_start
+            overlap = min(bucket_start + self.resolution, now) - max(bucket_start, start)
+            area += self._area[slot] * (overlap / covered if covered > 0 else 0.0)
+            peak = max(peak, self._peak[slot])
+            arrivals += self._arrivals[slot]
+        return area / seconds, peak, arrivals / seconds
+
+
+load_tracker = ConcurrencyTracker(max(LOAD_PANIC_WINDOW_SEC, LOAD_STABLE_WINDOW_SEC))
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request count, duration and in-flight gauge.
+
+    Paths are labelled with the route template so /fib?n=... stays one series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("fib.warmup"):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # Como o queue-proxy, a carga do KPA so conta pedidos de calculo (nao scrapes nem probes)
+        tracked = scope["path"].startswith(ADMISSION_PATHS)
+        REQUESTS_IN_FLIGHT.inc()
+        app.state.in_flight += 1
+        if tracked:
+            load_tracker.change(1)
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start_time
+            REQUESTS_IN_FLIGHT.dec()
+            app.state.in_flight -= 1
+            if tracked:
+                load_tracker.change(-1)
+            route = scope.get("route")
+            if route is not None:
+                path = route.path
+            elif any(scope["path"] == known.path for known in app.routes):
+                path = scope["path"]        # Rejeitado antes do routing (503 da admissao)
+            else:
+                path = "unmatched"
+            REQUEST_DURATION.labels(path).observe(duration)
+            REQUESTS_TOTAL.labels(scope["method"], path, str(status_code)).inc()
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded FIFO wait queue.
+
+    Runs entirely on the event loop: a finished request hands its slot
+    straight to the oldest waiter, so `active` never exceeds the limit.
+    """
+
+    def __init__(self, limit, queue_size, timeout):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.admitted = 0
+        self.shed = {"queue_full": 0, "queue_timeout": 0}
+        self._waiters = deque()
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        """Wait for a slot; return the shed reason, or None once admitted."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if self.timeout > 0:
+                await asyncio.wait_for(waiter, self.timeout)
+            else:
+                await waiter
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # O slot chegou ao mesmo tempo que o timeout: passa-o ao seguinte
+                self.release()
+            elif waiter in self._waiters:
+                # Um release() entre o cancelamento e este except ja o pode ter tirado da fila
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return self._reject("queue_timeout")
+        self.admitted += 1
+        return None
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _reject(self, reason):
+        self.shed[reason] += 1
+        REQUESTS_SHED.labels(reason).inc()
+        return reason
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "queue_size": self.queue_size,
+            "queue_timeout_sec": self.timeout,
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+
+
+admission = AdmissionController(ADMISSION_LIMIT, ADMISSION_QUEUE, ADMISSION_TIMEOUT_SEC)
+Gauge("fib_admission_active", "Requests holding an admission slot").set_function(lambda: admission.active)
+Gauge("fib_admission_queue_depth", "Requests waiting for an admission slot").set_function(lambda: admission.queue_depth)
+
+
+class AdmissionMiddleware:
+    """Apply the admission controller to compute routes; shed with 503 + Retry-After."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Os pedidos de aquecimento nao ocupam slots nem contam nas metricas de admissao
+        if (scope["type"] != "http" or admission.limit <= 0 or scope.get("fib.warmup")
+                or not scope["path"].startswith(ADMISSION_PATHS)):
+            await self.app(scope, receive, send)
+            return
+
+        wait_start = time.perf_counter()
+        reason = await admission.acquire()
+        wait = time.perf_counter() - wait_start
+        scope.setdefault("fib.timing", {})["admission"] = wait
+        if reason is not None:
+            body = f'{{"detail":"overloaded ({reason})"}}'.encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(RETRY_AFTER_SEC).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        ADMISSION_WAIT.observe(wait)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+
+class ServerTimingMiddleware:
+    """Add a Server-Timing header with the phases recorded in scope["fib.timing"].
+
+    Durations are in ms: admission wait, pool queue, compute, serialization
+    and total time in the app, plus pod identity and pod uptime so clients
+    can tell cold pods from queueing in front of the pod.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = scope.setdefault("fib.timing", {})
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                timing["app"] = time.perf_counter() - start_time
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(timing).encode()))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def format_server_timing(timing):
+    entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timing.items()]
+    entries.append(f'pod;desc="{POD_NAME}"')
+    entries.append(f"uptime;dur={(time.monotonic() - PROCESS_START) * 1000:.0f}")
+    return ", ".join(entries)
+
+
+def observe_compute(request, path, duration):
+    """Observe fib_compute_duration_seconds, except for the in-process warm-up requests."""
+    if not request.scope.get("fib.warmup"):
+        COMPUTE_DURATION.labels(path).observe(duration)
+
+
+def record_timing(request, name, seconds):
+    """Add seconds to a Server-Timing phase of this request."""
+    timing = request.scope.setdefault("fib.timing", {})
+    timing[name] = timing.get(name, 0.0) + seconds
+
+
+def json_response(request, content):
+    """Serialize content ourselves so the time spent encoding is measurable."""
+    start_time = time.perf_counter()
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    record_timing(request, "serialize", time.perf_counter() - start_time)
+    return Response(body, media_type="application/json")
+
+
+# O ultimo middleware adicionado e o mais exterior: as metricas tambem contam os 503
+# e o Server-Timing inclui a espera na admissao
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
+
+def result_size(value):
+    """Approximate memory of a cached result (an int or a list of ints), in bytes."""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """LRU cache bounded by entries and by bytes, with optional TTL and hit/miss/eviction counters.
+
+    The byte bound matters because entries differ by orders of magnitude: a
+    single F(n) is a few KB, a /fib/batch result can be megabytes, so any client
+    could otherwise fill the pod with distinct batches. Results larger than
+    max_bytes are not stored. A plain lock guards every operation, so the cache
+    is safe to share between the event loop and worker threads; no call ever awaits.
+    """
+
+    def __init__(self, capacity, ttl=0.0, max_bytes=0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.too_large = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (True, value) on a hit or (False, None) on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at, size = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._data[key]
+                self.bytes -= size
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        if self.capacity <= 0:
+            return
+        size = result_size(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            if self.max_bytes and size > self.max_bytes:
+                self.too_large += 1
+                return
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._data) > self.capacity or (self.max_bytes and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def reset(self):
+        """Drop every entry and zero the counters."""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = self.too_large = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "capacity": self.capacity,
+                "max_bytes": self.max_bytes,
+                "ttl_sec": self.ttl,
+                "size": len(self._data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "too_large": self.too_large,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SharedResultCache:
+    """Fixed-size, direct-mapped result cache in an mmap'd file shared by all worker processes.
+
+    Each slot is guarded by a seqlock: writers take a per-slot fcntl lock,
+    make the sequence number odd, write, and make it even again; readers
+    take no lock and retry when the sequence changed under them. A CRC over
+    the payload catches any torn read the seqlock misses. Keys are hashed
+    with blake2b because hash() differs between processes. Counters are
+    per process; the stored results are shared.
+    """
+
+    MAGIC = b"FIB4CACH"
+    FILE_HEADER = struct.Struct("<8sII")      # magic, slot_count, slot_size
+    FILE_HEADER_SIZE = 64
+    SLOT_HEADER = struct.Struct("<QQIId")     # seq, key hash, payload length, crc32, expires_at (0 = never)
+    SEQ = struct.Struct("<Q")
+    READ_RETRIES = 3
+
+    def __init__(self, path, slot_count, slot_size, ttl=0.0):
+        self.path = path
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.ttl = ttl
+        self.capacity = slot_count
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.too_large = 0
+        size = self.FILE_HEADER_SIZE + slot_count * slot_size
+        header = self.FILE_HEADER.pack(self.MAGIC, slot_count, slot_size)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # O primeiro worker (ou uma configuracao diferente) reinicializa o ficheiro
+            if os.fstat(self._fd).st_size != size or os.pread(self._fd, len(header), 0) != header:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _locate(self, key):
+        key_bytes = repr(key).encode()
+        digest = int.from_bytes(hashlib.blake2b(key_bytes, digest_size=8).digest(), "little")
+        offset = self.FILE_HEADER_SIZE + (digest % self.slot_count) * self.slot_size
+        return key_bytes, digest, offset
+
+    def get(self, key):
+        """Return (True, value) on a hit or (False, None) on a miss."""
+        key_bytes, digest, offset = self._locate(key)
+        start = offset + self.SLOT_HEADER.size
+        for _ in range(self.READ_RETRIES):
+            seq, slot_digest, length, crc, expires_at = self.SLOT_HEADER.unpack_from(self._map, offset)
+            if seq & 1:
+                continue
+            if seq == 0 or slot_digest != digest or length > self.slot_size - self.SLOT_HEADER.size:
+                break
+            payload = self._map[start:start + length]
+            if self.SEQ.unpack_from(self._map, offset)[0] != seq or zlib.crc32(payload) != crc:
+                continue
+            stored_key, value = pickle.loads(payload)
+            if stored_key != key_bytes:
+                break
+            if expires_at and time.monotonic() >= expires_at:
+                self.expirations += 1
+                break
+            self.hits += 1
+            return True, value
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        key_bytes, digest, offset = self._locate(key)
+        payload = pickle.dumps((key_bytes, value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.slot_size - self.SLOT_HEADER.size:
+            self.too_large += 1
+            return
+        # time.monotonic e comum a todos os processos no Linux
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+        start = offset + self.SLOT_HEADER.size
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.slot_size, offset)
+        try:
+            seq, slot_digest = self.SLOT_HEADER.unpack_from(self._map, offset)[:2]
+            if seq and slot_digest != digest:
+                self.evictions += 1
+            self.SEQ.pack_into(self._map, offset, seq + 1)
+            self._map[start:start + len(payload)] = payload
+            self.SLOT_HEADER.pack_into(self._map, offset, seq + 1, digest, len(payload),
+                                       zlib.crc32(payload), expires_at)
+            self.SEQ.pack_into(self._map, offset, seq + 2)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.slot_size, offset)
+
+    def reset(self):
+        """Zero this process's counters; the shared entries are kept for the other workers."""
+        self.hits = self.misses = self.evictions = self.expirations = self.too_large = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "shared": True,
+            "path": self.path,
+            "pid": os.getpid(),
+            "capacity": self.slot_count,
+            "slot_bytes": self.slot_size,
+            "ttl_sec": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "too_large": self.too_large,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+if SHARED_CACHE_SLOTS > 0:
+    result_cache = SharedResultCache(SHARED_CACHE_PATH, SHARED_CACHE_SLOTS, SHARED_CACHE_SLOT_BYTES, CACHE_TTL_SEC)
+else:
+    result_cache = LRUCache(CACHE_CAPACITY, CACHE_TTL_SEC, CACHE_MAX_BYTES)
+
+
+class SingleFlight:
+    """Coalesce concurrent identical computations into one shared task.
+
+    The first caller for a key (the leader) starts the task; callers that
+    arrive while it runs (followers) await the same task. The task is
+    shielded, so a leader whose client disconnects does not cancel the
+    work the followers are waiting on.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.leaders = 0
+        self.followers = 0
+        self._calls = {}
+
+    async def run(self, key, fn):
+        """Await fn() once per key in flight; return (result, coalesced)."""
+        if not self.enabled:
+            self.leaders += 1
+            return await fn(), False
+        task = self._calls.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.followers += 1
+        else:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task), coalesced
+
+    def reset(self):
+        self.leaders = self.followers = 0
+
+    @property
+    def ratio(self):
+        """Fraction of computing requests that reused another request's work."""
+        total = self.leaders + self.followers
+        return self.followers / total if total else 0.0
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalescing_ratio": self.ratio,
+        }
+
+
+single_flight = SingleFlight(COALESCE)
+Gauge("fib_coalesce_leaders", "Computations actually started").set_function(lambda: single_flight.leaders)
+Gauge("fib_coalesce_followers", "Requests that shared an in-flight computation").set_function(lambda: single_flight.followers)
+Gauge("fib_coalesce_ratio", "followers / (leaders + followers)").set_function(lambda: single_flight.ratio)
+
+
+async def cached_compute(path, cache_key, offload, fn, *args):
+    """Cache lookup, then a coalesced computation on a miss.
+
+    Returns (result, queue_time, cache_hit, coalesced).
+    """
+    cache_hit, result = result_cache.get(cache_key)
+    if cache_hit:
+        return result, 0.0, True, False
+
+    async def compute():
+        result, queue_time, _ = await run_compute(path, offload, fn, *args)
+        result_cache.put(cache_key, result)
+        return result, queue_time
+
+    (result, queue_time), coalesced = await single_flight.run(cache_key, compute)
+    return result, queue_time, False, coalesced
+
+
+def _build_fib_table(size):
+    """Precompute F(0)..F(size-1) once at import time."""
+    table = [0, 1]
+    while len(table) < size:
+        table.append(table[-1] + table[-2])
+    return table[:size]
+
+
+FIB_TABLE = _build_fib_table(max(FIB_TABLE_SIZE, 2))
+
+
+def _fib_pair(n):
+    """Fast doubling: return (F(n), F(n+1)) in O(log n) big-int multiplications."""
     a, b = 0, 1
-    for _ in range(n):
-        a, b = b, a + b
+    for bit in bin(n)[2:]:
+        # F(2k) = F(k) * (2*F(k+1) - F(k)), F(2k+1) = F(k)^2 + F(k+1)^2
+        c = a * ((b << 1) - a)
+        d = a * a + b * b
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def calculate_fibonacci(n: int):
+    if n < len(FIB_TABLE):
+        return FIB_TABLE[n]
+    return _fib_pair(n)[0]
+
+
+def calculate_fibonacci_mod(n, m):
+    """F(n) mod m by fast doubling on residues, without building F(n)."""
+    a, b = 0, 1 % m
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a) % m
+        d = (a * a + b * b) % m
+        if bit == "1":
+            a, b = d, (c + d) % m
+        else:
+            a, b = c, d
     return a
 
+
+def decimal_digits(value):
+    """Number of decimal digits of a non-negative int without converting it to str."""
+    digits = max(1, int((value.bit_length() - 1) * 0.30102999566398120) + 1)
+    while value >= 10 ** digits:
+        digits += 1
+    while digits > 1 and value < 10 ** (digits - 1):
+        digits -= 1
+    return digits
+
+
+def decimal_chunks(value, chunk_digits=DECIMAL_CHUNK_DIGITS):
+    """Yield the decimal representation of value in order, chunk by chunk.
+
+    Divide and conquer on powers 10**(chunk_digits * 2**k): the first chunk
+    is emitted after one descent instead of after the whole conversion, and
+    no single str() call exceeds the int->str digit limit.
+    """
+    powers = [10 ** chunk_digits]
+    while powers[-1] * powers[-1] <= value:
+        powers.append(powers[-1] * powers[-1])
+
+    def emit(part, level, pad):
+        if level < 0:
+            text = str(part)
+            yield text.zfill(chunk_digits) if pad else text
+            return
+        high, low = divmod(part, powers[level])
+        if high or pad:
+            yield from emit(high, level - 1, pad)
+            yield from emit(low, level - 1, True)
+        else:
+            yield from emit(low, level - 1, False)
+
+    yield from emit(value, len(powers) - 1, False)
+
+
+def encode_result(value, encoding, edge_digits=20, modulus=None):
+    """Render a (possibly huge) result in the requested encoding.
+
+    Every mode except decimal costs time linear in the size of the result.
+    """
+    if encoding == "hex":
+        return format(value, "x")
+    if encoding == "base64":
+        return base64.b64encode(value.to_bytes((value.bit_length() + 7) // 8 or 1, "big")).decode()
+    if encoding == "digits":
+        digits = decimal_digits(value)
+        edge = min(edge_digits, digits)
+        return {
+            "digits": digits,
+            "leading": str(value // 10 ** (digits - edge)),
+            "trailing": str(value % 10 ** edge).zfill(edge),
+        }
+    if encoding == "mod":
+        return value % modulus
+    if DECIMAL_JSON_MAX_DIGITS and value.bit_length() * 0.30103 > DECIMAL_JSON_MAX_DIGITS \
+            and decimal_digits(value) > DECIMAL_JSON_MAX_DIGITS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"result exceeds {DECIMAL_JSON_MAX_DIGITS} decimal digits; "
+                   f"use encoding=hex|base64|digits|mod or stream=true")
+    return value
+
+
+def validate_encoding(encoding, modulus, stream):
+    if encoding not in ENCODINGS:
+        raise HTTPException(status_code=422, detail=f"encoding must be one of {list(ENCODINGS)}")
+    if encoding == "mod" and modulus is None:
+        raise HTTPException(status_code=422, detail="encoding=mod requires m")
+    if stream and encoding != "decimal":
+        raise HTTPException(status_code=422, detail="stream=true is only available for encoding=decimal")
+
+
+def calculate_fibonacci_batch(numbers):
+    """Compute F(n) for many n in one ascending sweep.
+
+    Distinct values are sorted and the running pair (F(k), F(k+1)) is carried
+    from one target to the next, so close values only pay the additions in
+    between; a large gap jumps straight to the target with fast doubling.
+    """
+    results = {}
+    k, a, b = 0, 0, 1
+    for n in sorted(set(numbers)):
+        if n < len(FIB_TABLE):
+            results[n] = FIB_TABLE[n]
+            continue
+        if k < len(FIB_TABLE) - 1:
+            k, a, b = len(FIB_TABLE) - 2, FIB_TABLE[-2], FIB_TABLE[-1]
+        if n - k > 2 * n.bit_length():
+            k, (a, b) = n, _fib_pair(n)
+        while k < n:
+            k, a, b = k + 1, b, a + b
+        results[n] = a
+    return [results[n] for n in numbers]
+
+
+def batch_offload(numbers):
+    """True when a batch is expensive enough (see OFFLOAD_MIN_BATCH_WORK) to leave the event loop."""
+    top = max(numbers)
+    return top >= OFFLOAD_MIN_N or len(numbers) * top >= OFFLOAD_MIN_BATCH_WORK
+
+
+def kernel_cpu(ms):
+    """Spin until this thread has consumed `ms` of CPU time."""
+    deadline = time.thread_time() + ms / 1000
+    iterations = 0
+    while time.thread_time() < deadline:
+        iterations += 1
+    return iterations
+
+
+def kernel_matmul(size):
+    """Multiply two fixed-seed size x size float64 matrices (2*size^3 flops)."""
+    import numpy as np  # Opcional: so e importado por quem usa este kernel
+
+    rng = np.random.default_rng(0)
+    a = rng.random((int(size), int(size)))
+    return float(np.trace(a @ a))
+
+
+def kernel_memory(mb):
+    """Allocate `mb` MiB and write one byte per page so every page is resident."""
+    buffer = bytearray(int(mb * 1024 * 1024))
+    pages = (len(buffer) + PAGE_SIZE - 1) // PAGE_SIZE
+    buffer[::PAGE_SIZE] = b"\x01" * pages
+    return pages
+
+
+async def kernel_io(ms):
+    """Simulated downstream call: wait `ms` without using CPU."""
+    await asyncio.sleep(ms / 1000)
+    return ms
+
+
+# Kernels sincronos podem ir para o pool de workers; os async correm no event loop
+KERNELS = {
+    "cpu": kernel_cpu,
+    "matmul": kernel_matmul,
+    "memory": kernel_memory,
+    "io": kernel_io,
+}
+
+
 @app.get("/fib")
-async def fibonacci():
-    start_time = time.time()
-    number = 10
-    result = calculate_fibonacci(number)
-    duration = time.time() - start_time
-    
+async def fibonacci(request: Request, n: int = Query(DEFAULT_N, ge=0, le=FIB_MAX_N),
+                    encoding: str = Query("decimal"), edge_digits: int = Query(20, ge=1, le=1000),
+                    m: int = Query(None, ge=1), stream: bool = Query(False)):
+    validate_encoding(encoding, m, stream)
+    start_time = time.perf_counter()
+    if encoding == "mod":
+        # F(n) mod m calcula-se em residuos, sem nunca construir F(n)
+        result, queue_time, cache_hit, coalesced = await cached_compute(
+            "/fib", ("fib_mod", n, m), False, calculate_fibonacci_mod, n, m)
+    else:
+        result, queue_time, cache_hit, coalesced = await cached_compute(
+            "/fib", ("fib", n), n >= OFFLOAD_MIN_N, calculate_fibonacci, n)
+    duration = time.perf_counter() - start_time - queue_time
+    observe_compute(request, "/fib", duration)
+    record_timing(request, "pool", queue_time)
+    record_timing(request, "compute", duration)
+
+    if stream:
+        return StreamingResponse(decimal_chunks(result), media_type="text/plain")
+    encode_start = time.perf_counter()
+    encoded = result if encoding == "mod" else encode_result(result, encoding, edge_digits, m)
+    record_timing(request, "serialize", time.perf_counter() - encode_start)
+
+    return json_response(request, {
+        "input_number": n,
+        "encoding": encoding,
+        "fibonacci_result": encoded,
+        "computation_time_sec": duration,
+        "queue_time_sec": queue_time,
+        "cache_hit": cache_hit,
+        "coalesced": coalesced
+    })
+
+
+@app.get("/fib/batch")
+async def fibonacci_batch(request: Request, n: List[int] = Query(...),
+                          encoding: str = Query("decimal"), edge_digits: int = Query(20, ge=1, le=1000),
+                          m: int = Query(None, ge=1)):
+    validate_encoding(encoding, m, False)
+    if len(n) > FIB_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"at most {FIB_BATCH_MAX} values per batch")
+    if any(value < 0 or value > FIB_MAX_N for value in n):
+        raise HTTPException(status_code=422, detail=f"every n must be between 0 and {FIB_MAX_N}")
+    start_time = time.perf_counter()
+    results, queue_time, cache_hit, coalesced = await cached_compute(
+        "/fib/batch", ("batch", tuple(n)), batch_offload(n), calculate_fibonacci_batch, n)
+    duration = time.perf_counter() - start_time - queue_time
+    observe_compute(request, "/fib/batch", duration)
+    record_timing(request, "pool", queue_time)
+    record_timing(request, "compute", duration)
+    encode_start = time.perf_counter()
+    encoded = [encode_result(value, encoding, edge_digits, m) for value in results]
+    record_timing(request, "serialize", time.perf_counter() - encode_start)
+
+    return json_response(request, {
+        "input_numbers": n,
+        "encoding": encoding,
+        "fibonacci_results": encoded,
+        "computation_time_sec": duration,
+        "queue_time_sec": queue_time,
+        "cache_hit": cache_hit,
+        "coalesced": coalesced
+    })
+
+
+@app.get("/work")
+async def work(request: Request, kernel: str = Query(WORK_KERNEL), amount: float = Query(WORK_AMOUNT, ge=0)):
+    fn = KERNELS.get(kernel)
+    if fn is None:
+        raise HTTPException(status_code=422, detail=f"kernel must be one of {sorted(KERNELS)}")
+    if amount > WORK_MAX_AMOUNT[kernel]:
+        raise HTTPException(status_code=422, detail=f"amount for {kernel} must be at most {WORK_MAX_AMOUNT[kernel]}")
+    start_time = time.perf_counter()
+    queue_time = 0.0
+    try:
+        if asyncio.iscoroutinefunction(fn):
+            result = await fn(amount)
+        else:
+            result, queue_time, _ = await run_compute("/work", True, fn, amount,
+                                                       observe=not request.scope.get("fib.warmup"))
+    except ImportError as e:
+        raise HTTPException(status_code=501, detail=f"kernel {kernel} unavailable: {e}")
+    duration = time.perf_counter() - start_time - queue_time
+    observe_compute(request, "/work", duration)
+    record_timing(request, "pool", queue_time)
+    record_timing(request, "compute", duration)
+
+    return json_response(request, {
+        "kernel": kernel,
+        "amount": amount,
+        "result": result,
+        "computation_time_sec": duration,
+        "queue_time_sec": queue_time
+    })
+
+
+@app.get("/debug/load")
+async def debug_load():
+    windows = {}
+    for name, seconds in (("panic", LOAD_PANIC_WINDOW_SEC), ("stable", LOAD_STABLE_WINDOW_SEC)):
+        average, peak, rps = load_tracker.window(seconds)
+        windows[name] = {
+            "window_sec": seconds,
+            "avg_concurrency": average,
+            "max_concurrency": peak,
+            "requests_per_sec": rps,
+            "utilization": average / ADMISSION_LIMIT if ADMISSION_LIMIT > 0 else None,
+        }
     return {
-        "input_number": number,
-        "fibonacci_result": result,
-        "computation_time_sec": duration
+        "pod": POD_NAME,
+        "uptime_sec": time.monotonic() - PROCESS_START,
+        "in_flight": load_tracker.current,
+        "target": ADMISSION_LIMIT,
+        "queue_depth": admission.queue_depth,
+        "draining": app.state.draining,
+        **windows,
     }
+
+
+@app.get("/debug/memory")
+async def debug_memory(top: int = Query(10, ge=1, le=100)):
+    memory = process_memory()
+    budget = int(MEMORY_BUDGET_MB * 1024 * 1024)
+    report = {
+        "pod": POD_NAME,
+        "lean": LEAN,
+        **memory,
+        "budget_bytes": budget or None,
+        "over_budget": bool(budget and memory["rss_bytes"] and memory["rss_bytes"] > budget),
+        "python": {
+            "allocated_blocks": sys.getallocatedblocks(),
+            "gc_counts": gc.get_count(),
+            "gc_frozen_objects": gc.get_freeze_count(),
+            "loaded_modules": len(sys.modules),
+        },
+        "gc": gc_monitor.stats(),
+        "tracemalloc": None,
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        report["tracemalloc"] = {
+            "traced_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [
+                {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:top]
+            ],
+        }
+    return report
+
+
+@app.get("/healthz/ready")
+async def ready():
+    if not app.state.ready or app.state.draining:
+        return Response(status_code=503)
+    return {"ready": True}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return result_cache.stats()
+
+
+@app.get("/coalesce/stats")
+async def coalesce_stats():
+    return single_flight.stats()
+
+
+@app.get("/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,99 +1,34 @@
-import aiohttp
 import asyncio
-import time
-from datetime import datetime
+import loadgen
 
 
- # This Script is an asynchronous "YoYo Attack" tool that performs a load test on (http://knative-fn4.default.127.0.0.1.nip.io/fib) by sending HTTP GET requests. 
- # It alternates between high-concurrency "attack" phases (200 concurrent requests for 240 seconds) and no-request "cool down" phases (0 requests for 1200 seconds). 
- # For each request, it calculates the response time and logs the timestamp, duration (in seconds), and either the HTTP status code or error message to a file (attack_metrics.log). 
- # The script runs indefinitely until interrupted, displaying real-time progress (active tasks, elapsed, and remaining time). 
- # It uses aiohttp for async requests, manages connections efficiently, and handles logging asynchronously to avoid blocking.
+ # Baseline: trafego legitimo constante (1 utilizador) contra o knative-fn4 durante 12 horas.
+ # Preset do motor de carga em loadgen.py; cada pedido e registado no LOG_FILE com o timestamp,
+ # a duracao (segundos), o HTTP status e o Server-Timing do pod, ou a mensagem de erro.
+ # Ao contrario do ataque, os workers reutilizam ligacoes (keep-alive) e esperam SLEEP_INTERVAL entre pedidos.
+
 
- 
 # Configuration
 TARGET_URL = "http://knative-fn4.default.127.0.0.1.nip.io/fib"
 CONCURRENCY = 1              # Constant concurrency to simulate legitimate traffic
-CONNECTION_TIMEOUT = aiohttp.ClientTimeout(total=10)
 LOG_FILE = "logs/baseline_metrics.log"
 SLEEP_INTERVAL = 1            # Seconds between requests for each worker
 RUN_DURATION = 12 * 60 * 60   # Total run time in seconds (12 hours)
 
-async def logger(queue, log_file):
-    loop = asyncio.get_running_loop()
-    while True:
-        message = await queue.get()
-        if message is None:
-            break
-        await loop.run_in_executor(None, write_log, log_file, message)
-
-
-def write_log(log_file, message):
-    log_file.write(message)
-    log_file.flush()
-
-async def worker(session, queue):
-    """Async worker that makes requests, logs metrics, sleeps, and repeats until cancelled"""
-    while True:
-        start_time = time.perf_counter()
-        timestamp = datetime.now().isoformat()
-        try:
-            async with session.get(TARGET_URL) as response:
-                await response.text()
-                end_time = time.perf_counter()
-                duration = end_time - start_time
-                status = response.status
-                message = f"{timestamp},{duration:.3f},HTTP {status}\n"
-        except Exception as e:
-            end_time = time.perf_counter()
-            duration = end_time - start_time
-            error_msg = str(e)
-            message = f"{timestamp},FAIL,{error_msg}\n"
-        await queue.put(message)
-        await asyncio.sleep(SLEEP_INTERVAL)
 
 async def main():
     print("Async Baseline Simulation Script (12 hours)")
     print(f"Target: {TARGET_URL}")
     print(f"Concurrency: {CONCURRENCY}")
-
-    start_time = time.time()
-    with open(LOG_FILE, "a") as log_file:
-        queue = asyncio.Queue()
-        logger_task = asyncio.create_task(logger(queue, log_file))
-
-        connector = aiohttp.TCPConnector(limit=0)
-        async with aiohttp.ClientSession(
-            connector=connector,
-            timeout=CONNECTION_TIMEOUT,
-            auto_decompress=True
-        ) as session:
-            tasks = [asyncio.create_task(worker(session, queue)) for _ in range(CONCURRENCY)]
-
-            #Debug
-            await queue.put(f"Baseline simulation started at {datetime.now().isoformat()}\n")
-
-            # Run for 12 hours seconds
-            try:
-                while time.time() - start_time < RUN_DURATION:
-                    elapsed = int(time.time() - start_time)
-                    print(f"\rActive workers: {len(tasks)} | Elapsed: {elapsed}s", end="")
-                    await asyncio.sleep(1)
-            except asyncio.CancelledError:
-                pass
-
-            print("\nReached 12 hours. Stopping simulation.")
-            # Cancel workers
-            for task in tasks:
-                task.cancel()
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-            #Parar a simulaçao para Debug
-            await queue.put(f"Simulation stopped at {datetime.now().isoformat()}\n")
-
-        # Signal logger to exit
-        await queue.put(None)
-        await logger_task
+    stats = await loadgen.run(
+        loadgen.Constant(CONCURRENCY),
+        url=TARGET_URL,
+        duration=RUN_DURATION,
+        log_path=LOG_FILE,
+        think_time=SLEEP_INTERVAL,
+        connection=f"pool:{CONCURRENCY}",     # keep-alive, como um cliente normal
+    )
+    loadgen.report_generator([stats], LOG_FILE + loadgen.HIST_SUFFIX)
 
 if __name__ == "__main__":
     asyncio.run(main())
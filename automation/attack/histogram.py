@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+histogram.py
+
+Histograma de latencias log-linear (estilo HdrHistogram) para o loadgen.py:
+memoria fixa, record() em O(1) e histogramas do mesmo tamanho somam-se
+(merge), por isso processos diferentes ou segundos diferentes juntam-se sem
+guardar as latencias individuais.
+
+Os valores sao guardados em microsegundos. Ate 2**SUB_BUCKET_BITS us cada valor
+tem o seu bucket; acima disso cada potencia de 2 tem 2**(SUB_BUCKET_BITS - 1)
+buckets, ou seja erro relativo < 1 / 2**(SUB_BUCKET_BITS - 1) (~1.6% com 7 bits).
+
+O loadgen.py grava tambem um ficheiro <log>.hist com um histograma por ocorrencia
+de fase e por classe de status; este script resume-o sem reler o log. Como o log,
+o ficheiro acumula runs: cada bloco leva o id do run (o seu inicio em ns), e o
+resumo e por omissao so o do ultimo run.
+
+Usage:
+    python automation/attack/histogram.py logs/attack_metrics.log.hist
+    python automation/attack/histogram.py logs/attack_metrics.log.hist --per-window
+    python automation/attack/histogram.py logs/attack_metrics.log.hist --all-runs
+"""
+
+import argparse
+import os
+import shutil
+import struct
+from datetime import datetime
+
+SUB_BUCKET_BITS = 7
+MAX_VALUE_US = 120 * 1_000_000       # Latencias acima de 120 s ficam no ultimo bucket
+
+
+class Histogram:
+    def __init__(self, sub_bucket_bits=SUB_BUCKET_BITS, max_value_us=MAX_VALUE_US):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value_us = max_value_us
+        self._sub_count = 1 << sub_bucket_bits
+        self._half = self._sub_count >> 1
+        self.counts = [0] * (self._index(max_value_us) + 1)
+        self.total = 0
+        self.max_us = 0
+
+    def _index(self, value_us):
+        if value_us < self._sub_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        return self._sub_count + (shift - 1) * self._half + (value_us >> shift) - self._half
+
+    def _lowest(self, index):
+        """Smallest value (us) that lands in bucket `index`."""
+        if index < self._sub_count:
+            return index
+        shift, sub = divmod(index - self._sub_count, self._half)
+        return (sub + self._half) << (shift + 1)
+
+    def record(self, seconds):
+        value_us = min(int(seconds * 1_000_000), self.max_value_us)
+        if value_us < 0:
+            value_us = 0
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts):
+            raise ValueError("histograms with different bucket layouts cannot be merged")
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.total += other.total
+        self.max_us = max(self.max_us, other.max_us)
+        return self
+
+    def percentiles(self, quantiles):
+        """Values in seconds for the ascending `quantiles` (0..1), one pass over the buckets."""
+        results = []
+        if not self.total:
+            return [0.0] * len(quantiles)
+        targets = [max(1, int(q * self.total + 0.5)) for q in quantiles]
+        seen = 0
+        t = 0
+        for i, count in enumerate(self.counts):
+            if not count:
+                continue
+            seen += count
+            while t < len(targets) and seen >= targets[t]:
+                # meio do bucket, limitado pelo maximo observado
+                value = (self._lowest(i) + self._lowest(i + 1)) / 2
+                results.append(min(value, self.max_us) / 1_000_000)
+                t += 1
+            if t == len(targets):
+                break
+        return results
+
+    def sparse(self):
+        """{bucket: count} for the non-empty buckets, cheap to send to another process."""
+        return {i: count for i, count in enumerate(self.counts) if count}
+
+    def merge_sparse(self, buckets, max_us=0):
+        for i, count in buckets.items():
+            self.counts[i] += count
+            self.total += count
+        self.max_us = max(self.max_us, max_us)
+        return self
+
+
+# --- Histogramas por janela de fase e classe de status, gravados em ficheiro ---
+#
+# Uma janela e uma ocorrencia de uma fase do plano (ex.: o 3o ataque do yo-yo).
+# No fim de cada janela os seus histogramas sao acrescentados ao ficheiro como
+# blocos; a memoria fica limitada as janelas ainda abertas. Os indices das janelas
+# recomecam em 0 em cada run, por isso os blocos sao identificados por (run, janela).
+
+MAGIC = b"FIBHIST\0"
+FILE_HEADER = struct.Struct("<8sIIQ")       # magic, version, sub_bucket_bits, max_value_us
+BLOCK_HEADER = struct.Struct("<QqqIBBIQ")   # run id, start_ns, end_ns, window, phase, status class, n buckets, max_us
+BUCKET = struct.Struct("<HI")               # bucket index, count
+VERSION = 2
+
+STATUS_CLASSES = {0: "error", 1: "1xx", 2: "2xx", 3: "3xx", 4: "4xx", 5: "5xx"}
+
+
+def status_class(status, error):
+    """0 for client-side failures, otherwise the hundreds digit of the HTTP status."""
+    if error is not None:
+        return 0
+    return min(max(status // 100, 1), 5)
+
+
+def check_file(path):
+    """Raise ValueError if `path` exists and is not a histogram file of this VERSION."""
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return
+    with open(path, "rb") as f:
+        magic, version, _, _ = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a version {VERSION} histogram file; move it away or use another --log")
+
+
+class HistogramWriter:
+    """One Histogram per (window, status class); each window is appended to `path` when it closes.
+
+    `run_id` tags every block, so runs appended to the same file stay apart.
+    """
+
+    def __init__(self, path, run_id):
+        check_file(path)
+        self.path = path
+        self.run_id = run_id
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION, SUB_BUCKET_BITS, MAX_VALUE_US))
+        self._windows = {}
+
+    def open_window(self, window, phase, start_epoch, end_epoch):
+        self._windows[window] = (phase, start_epoch, end_epoch, {})
+
+    def record(self, window, duration, status, error):
+        classes = self._windows[window][3]
+        cls = status_class(status, error)
+        histogram = classes.get(cls)
+        if histogram is None:
+            histogram = classes[cls] = Histogram()
+        histogram.record(duration)
+
+    def flush_window(self, window):
+        phase, start_epoch, end_epoch, classes = self._windows.pop(window)
+        chunks = []
+        for cls, histogram in sorted(classes.items()):
+            buckets = histogram.sparse()
+            chunks.append(BLOCK_HEADER.pack(self.run_id, int(start_epoch * 1e9), int(end_epoch * 1e9), window,
+                                            phase, cls, len(buckets), histogram.max_us))
+            chunks.extend(BUCKET.pack(i, count) for i, count in buckets.items())
+        self._file.write(b"".join(chunks))
+        self._file.flush()
+
+    def close(self):
+        for window in list(self._windows):
+            self.flush_window(window)
+        self._file.close()
+
+
+def read_blocks(path):
+    """Yield (run, start_ns, end_ns, window, phase, status class, Histogram) for every block in `path`."""
+    with open(path, "rb") as f:
+        magic, version, sub_bucket_bits, max_value_us = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a histogram file (magic={magic!r}, version={version})")
+        while True:
+            raw = f.read(BLOCK_HEADER.size)
+            if len(raw) < BLOCK_HEADER.size:
+                return
+            run, start_ns, end_ns, window, phase, cls, n, max_us = BLOCK_HEADER.unpack(raw)
+            histogram = Histogram(sub_bucket_bits, max_value_us)
+            data = f.read(n * BUCKET.size)
+            histogram.merge_sparse(dict(BUCKET.iter_unpack(data)), max_us)
+            yield run, start_ns, end_ns, window, phase, cls, histogram
+
+
+def append_blocks(src, out):
+    """Copy the blocks of histogram file `src` to the open file `out` (header written if empty)."""
+    with open(src, "rb") as f:
+        header = f.read(FILE_HEADER.size)
+        if out.tell() == 0:
+            out.write(header)
+        shutil.copyfileobj(f, out)
+
+
+def summary_lines(path, per_window=False, run=None, all_runs=False):
+    """Latency summary per phase (or per phase window) and status class, merged from the blocks.
+
+    Only the blocks of `run` are used (default: the last run in the file), unless `all_runs`.
+    """
+    blocks = list(read_blocks(path))
+    if run is None and blocks:
+        run = blocks[-1][0]
+    merged = {}
+    starts = {}
+    for block_run, start_ns, end_ns, window, phase, cls, histogram in blocks:
+        if not all_runs and block_run != run:
+            continue
+        # os blocos de processos diferentes da mesma janela juntam-se por (run, janela)
+        key = ((block_run, window), phase, cls) if per_window else (phase, cls)
+        starts.setdefault((block_run, window), start_ns)
+        if key in merged:
+            merged[key].merge(histogram)
+        else:
+            merged[key] = histogram
+    lines = []
+    for key, histogram in sorted(merged.items()):
+        label = f"Phase {key[-2]} {STATUS_CLASSES.get(key[-1], key[-1])}"
+        if per_window:
+            label = f"{datetime.fromtimestamp(starts[key[0]] / 1e9).isoformat()} {label}"
+        p50, p90, p99, p999 = (v * 1000 for v in histogram.percentiles([0.5, 0.9, 0.99, 0.999]))
+        lines.append(f"{label}: {histogram.total} requests | p50 {p50:.1f}ms p90 {p90:.1f}ms "
+                     f"p99 {p99:.1f}ms p99.9 {p999:.1f}ms max {histogram.max_us / 1000:.1f}ms")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency summary from a loadgen histogram file")
+    parser.add_argument("path")
+    parser.add_argument("--per-window", action="store_true", help="One line per phase occurrence")
+    parser.add_argument("--all-runs", action="store_true", help="Merge every run in the file, not just the last one")
+    args = parser.parse_args()
+    for line in summary_lines(args.path, args.per_window, all_runs=args.all_runs):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1214 @@
+#!/usr/bin/env python3
+"""
+loadgen.py
+
+Motor de carga unico para o knative-fn4. Uma forma de trafego (traffic shape)
+diz quantos workers concorrentes devem estar ativos em cada instante; um so
+event loop asyncio, com uma so ClientSession, ajusta o numero de workers a
+essa forma durante todo o teste. O baseline.py e o yo-yoattack.py sao apenas
+presets deste motor.
+
+Usage:
+    python automation/attack/loadgen.py --shape yoyo --high 265 --low 0 --on 35 --off 900 --force-close
+    python automation/attack/loadgen.py --shape constant --concurrency 1 --think-time 1
+    python automation/attack/loadgen.py --shape ramp --start 0 --end 300 --ramp-duration 600
+    python automation/attack/loadgen.py --shape sinusoid --mean 100 --amplitude 80 --period 900
+    python automation/attack/loadgen.py --shape poisson --mean-interval 600 --high 265 --on 35
+    python automation/attack/loadgen.py --schedule automation/attack/schedules/yoyo_with_ramp.json
+    python automation/attack/loadgen.py --open-loop --shape yoyo --high 400 --low 1 --on 35 --off 900
+    python automation/attack/loadgen.py --log-format binary --log logs/attack_metrics.bin
+    python automation/attack/loadgen.py --processes 8 --uvloop --shape yoyo --high 2000 --force-close
+    python automation/attack/loadgen.py --trace --force-close --log-format binary --log logs/attack_trace.bin
+    python automation/attack/loadgen.py --shape yoyo --high 265 --low 1 --phase-connection 1=prewarmed:265 --phase-connection 0=pool:1
+
+Com --open-loop o valor da forma passa a ser a taxa de chegada (pedidos/s):
+os pedidos saem no instante previsto, quer as respostas anteriores ja tenham
+chegado ou nao. A latencia registada conta a partir do instante previsto
+(correcao de coordinated omission) e cada linha leva mais duas colunas,
+service_s (desde o envio real) e send_lag_ms (envio real - previsto).
+
+Com --log-format binary cada pedido e um registo de largura fixa (ver reqlog.py),
+lido sem parsing com reqlog.read_records().
+
+Com --trace, hooks do aiohttp (TraceConfig) medem as fases de cada pedido do
+lado do cliente: espera por ligacao, DNS, connect, time-to-first-byte e body.
+No log de texto sao 5 colunas extra no fim da linha (ms); no binario vao no
+registo (versao 2). Assim separa-se o custo de ligacao ao ingress/Kourier do
+tempo de fila do Knative e dos cold starts.
+
+Estrategias de ligacao (--connection, ou por fase com --phase-connection FASE=ESTRATEGIA):
+    fresh            uma ligacao TCP nova por pedido (comportamento do atacante, = --force-close)
+    pool[:N]         pool keep-alive, limitado a N ligacoes (sem N: ilimitado)
+    prewarmed:N      N ligacoes keep-alive abertas PREWARM_LEAD segundos antes de a fase comecar
+                     (com GETs a PREWARM_PATH, sem calculo, anotados no log de texto)
+Cada estrategia tem a sua sessao e as suas estatisticas de reutilizacao de ligacoes.
+
+As fronteiras das fases (ex.: ataque/pausa no yo-yo) sao planeadas no inicio,
+em time.monotonic relativo ao arranque, por isso nao acumulam desvio ao longo de
+12 horas. No fim de cada fase os workers sao cancelados no prazo exato (os
+pedidos em voo ficam no log como CANCELLED, fora da taxa de erro e dos
+histogramas; ao reduzir workers dentro de uma fase, os retirados acabam o pedido em
+curso e registam-no) e o log leva marcadores
+"Phase N started at ..." / "Phase N ended at ..." com o instante planeado.
+
+Alem do log, cada run grava <log>.hist: um histograma log-linear (histogram.py)
+por ocorrencia de fase e classe de status, escrito em cada fronteira de fase,
+de onde sai o resumo de latencias no fim sem reler o log (so os blocos deste run,
+o ficheiro acumula runs como o log).
+
+Com --processes N o coordenador lanca N processos, cada um com o seu event loop
+e 1/N da forma de trafego, todos a arrancar no mesmo instante de time.monotonic.
+No fim os logs parciais sao juntos no --log e cada processo reporta o lag do
+seu event loop e o CPU usado, para confirmar que o gargalo nao e o gerador.
+"""
+
+import aiohttp
+import argparse
+import asyncio
+import bisect
+import heapq
+import json
+import os
+import shutil
+import math
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+import multiprocessing
+
+import reqlog
+from histogram import Histogram, HistogramWriter, append_blocks, check_file, summary_lines
+
+# Configuration
+TARGET_URL = "http://knative-fn4.default.127.0.0.1.nip.io/fib"
+CONNECTION_TIMEOUT = aiohttp.ClientTimeout(total=10)
+RUN_DURATION = 12 * 60 * 60          # Total run time in seconds (12 hours)
+CONTROL_INTERVAL = 0.1               # Segundos entre ajustes do numero de workers a forma de trafego
+LOG_FILE = "logs/loadgen_metrics.log"
+LOG_FLUSH_INTERVAL = 1.0             # Segundos entre escritas do log em bloco
+LOG_FLUSH_BYTES = 256 * 1024         # ... ou antes, quando ha este volume por escrever
+HIST_SUFFIX = ".hist"                # Histogramas por fase e classe de status gravados em <log>.hist
+LOG_MAX_QUEUED = 200000              # Linhas em espera acima disto sao descartadas (e contadas)
+STARTUP_GRACE = 2.0                  # Multi-processo: segundos para todos os processos arrancarem antes do inicio
+LOOP_LAG_WARN_MS = 50                # Lag do event loop (p99) acima disto: o gerador e o gargalo
+CPU_WARN = 0.9                       # Fracao de um core usada por processo acima da qual o gerador e o gargalo
+PREWARM_LEAD = 2.0                   # Segundos antes da fase em que as ligacoes prewarmed sao abertas
+PREWARM_PATH = "/healthz/ready"      # Caminho sem calculo, na mesma origem, usado para abrir as ligacoes prewarmed
+MAX_OUTSTANDING = 5000               # Open-loop: pedidos em voo acima disto sao registados como FAIL (gerador saturado)
+
+# Colunas extra de cada linha do log, lidas do header Server-Timing do app4:
+# pod,uptime_ms,admission_ms,pool_ms,compute_ms,serialize_ms,app_ms
+SERVER_TIMING_FIELDS = ["pod", "uptime", "admission", "pool", "compute", "serialize", "app"]
+
+
+# --- Traffic shapes: concurrency_at(t) devolve o numero de workers aos t segundos ---
+
+class Constant:
+    def __init__(self, concurrency):
+        self.concurrency = int(concurrency)
+
+    def concurrency_at(self, t):
+        return self.concurrency
+
+
+class SquareWave:
+    """Yo-yo: `high` workers for `on` seconds, then `low` workers for `off` seconds, repeated."""
+
+    def __init__(self, high, low=0, on=35, off=900):
+        self.high, self.low = int(high), int(low)
+        self.on, self.off = float(on), float(off)
+
+    def concurrency_at(self, t):
+        return self.high if self.phase_at(t) else self.low
+
+    def phase_at(self, t):
+        return 1 if t % (self.on + self.off) < self.on else 0
+
+    def boundaries(self, duration):
+        period = self.on + self.off
+        cycles = int(duration // period) + 1
+        # k * period em vez de somas sucessivas: sem erro acumulado
+        return [k * period + offset for k in range(cycles) for offset in (0.0, self.on)]
+
+
+class Ramp:
+    """Linear ramp from `start` to `end` workers over `duration` seconds, then hold `end`."""
+
+    def __init__(self, start, end, duration):
+        self.start, self.end = int(start), int(end)
+        self.duration = float(duration)
+
+    def concurrency_at(self, t):
+        if t >= self.duration:
+            return self.end
+        return round(self.start + (self.end - self.start) * t / self.duration)
+
+
+class Sinusoid:
+    def __init__(self, mean, amplitude, period, phase=0.0):
+        self.mean, self.amplitude = float(mean), float(amplitude)
+        self.period, self.phase = float(period), float(phase)
+
+    def concurrency_at(self, t):
+        value = self.mean + self.amplitude * math.sin(2 * math.pi * t / self.period + self.phase)
+        return max(0, round(value))
+
+
+class PoissonBursts:
+    """Bursts of `high` workers lasting `on` seconds, starting as a Poisson process.
+
+    Burst start times are drawn from a seeded generator, so a schedule is
+    reproducible across runs; between bursts `low` workers stay active.
+    """
+
+    def __init__(self, mean_interval, high, on=35, low=0, seed=0):
+        self.mean_interval = float(mean_interval)
+        self.high, self.low = int(high), int(low)
+        self.on = float(on)
+        self._rng = random.Random(seed)
+        self._starts = [self._rng.expovariate(1 / self.mean_interval)]
+
+    def concurrency_at(self, t):
+        return self.high if self.phase_at(t) else self.low
+
+    def phase_at(self, t):
+        while self._starts[-1] <= t:
+            self._starts.append(self._starts[-1] + self._rng.expovariate(1 / self.mean_interval))
+        i = bisect.bisect_right(self._starts, t) - 1
+        return 1 if i >= 0 and t < self._starts[i] + self.on else 0
+
+    def boundaries(self, duration):
+        self.phase_at(duration)
+        return [t for start in self._starts for t in (start, start + self.on)]
+
+
+class Piecewise:
+    """Custom schedule: a list of segments, each holding or ramping the concurrency.
+
+    Segment: {"duration": s, "concurrency": c} or {"duration": s, "from": a, "to": b}.
+    With `repeat` the list loops; otherwise concurrency is 0 after the last segment.
+    """
+
+    def __init__(self, segments, repeat=True):
+        if not segments:
+            raise ValueError("piecewise schedule needs at least one segment")
+        self.segments = segments
+        self.repeat = repeat
+        self._ends = []
+        total = 0.0
+        for segment in segments:
+            total += float(segment["duration"])
+            self._ends.append(total)
+        self.total = total
+
+    def concurrency_at(self, t):
+        if not self.repeat and t >= self.total:
+            return 0
+        i = self.phase_at(t)
+        segment = self.segments[i]
+        if self.repeat:
+            t %= self.total
+        if "concurrency" in segment:
+            return int(segment["concurrency"])
+        start = self._ends[i] - float(segment["duration"])
+        fraction = (t - start) / float(segment["duration"])
+        return round(segment["from"] + (segment["to"] - segment["from"]) * fraction)
+
+    def phase_at(self, t):
+        """Index of the active segment."""
+        if self.repeat:
+            t %= self.total
+        return min(bisect.bisect_right(self._ends, t), len(self.segments) - 1)
+
+    def boundaries(self, duration):
+        cycles = int(duration // self.total) + 1 if self.repeat else 1
+        return [k * self.total + start for k in range(cycles) for start in [0.0] + self._ends]
+
+
+SHAPES = {
+    "constant": Constant,
+    "yoyo": SquareWave,
+    "ramp": Ramp,
+    "sinusoid": Sinusoid,
+    "poisson": PoissonBursts,
+    "piecewise": Piecewise,
+}
+
+
+def phase_of(shape, t):
+    """Phase id logged with each request; shapes without phases are always phase 0."""
+    phase_at = getattr(shape, "phase_at", None)
+    return min(phase_at(t), 255) if phase_at else 0
+
+
+def plan_phases(shape, duration):
+    """Plan every phase of the run up front: [(start, end, phase), ...] in seconds from the start."""
+    boundaries = getattr(shape, "boundaries", None)
+    cuts = sorted({0.0, *(t for t in boundaries(duration) if 0 < t < duration)}) if boundaries else [0.0]
+    plan = []
+    for start, end in zip(cuts, cuts[1:] + [duration]):
+        # a fase e lida a meio do intervalo, longe de erros de arredondamento na fronteira
+        phase = phase_of(shape, (start + end) / 2)
+        if plan and plan[-1][2] == phase:
+            plan[-1] = (plan[-1][0], end, phase)
+        else:
+            plan.append((start, end, phase))
+    return plan
+
+
+def build_shape(spec):
+    """Build a shape from a dict such as {"shape": "yoyo", "high": 265, "on": 35, "off": 900}."""
+    spec = dict(spec)
+    kind = spec.pop("shape")
+    if kind not in SHAPES:
+        raise ValueError(f"unknown shape {kind!r}; expected one of {sorted(SHAPES)}")
+    return SHAPES[kind](**spec)
+
+
+def load_schedule(path):
+    """Read a shape spec from a JSON or YAML file."""
+    with open(path, "r") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+# --- Workers e logging ---
+
+def parse_server_timing(header):
+    """Return the SERVER_TIMING_FIELDS as CSV columns (empty when the header is missing)."""
+    values = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key in ("dur", "desc"):
+                values[name] = value.strip('"')
+    return ",".join(values.get(field, "") for field in SERVER_TIMING_FIELDS)
+
+
+class LogWriter:
+    """Batching log writer: the request path only appends to a list.
+
+    A single task drains the list every `flush_interval` seconds, or sooner once
+    `flush_bytes` are buffered, and writes the whole chunk with one call in a
+    worker thread. Past `max_queued` lines new messages are dropped and counted
+    instead of growing memory without bound.
+    """
+
+    joiner = ""
+
+    def __init__(self, log_file, trace=False, flush_interval=LOG_FLUSH_INTERVAL,
+                 flush_bytes=LOG_FLUSH_BYTES, max_queued=LOG_MAX_QUEUED):
+        self.log_file = log_file
+        self.trace = trace
+        self.live = None
+        self.histograms = None
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self.max_queued = max_queued
+        self.records = 0
+        self.written = 0
+        self.dropped = 0
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = None
+
+    @property
+    def queued(self):
+        return len(self._buffer)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def note(self, text):
+        self.put(text + "\n")
+
+    def phase_marker(self, event, phase, epoch_s):
+        """`event` is "started" or "ended"; epoch_s is the planned boundary."""
+        self.note(f"Phase {phase} {event} at {datetime.fromtimestamp(epoch_s).isoformat()}")
+
+    def open_window(self, window, phase, start_epoch, end_epoch):
+        if self.histograms is not None:
+            self.histograms.open_window(window, phase, start_epoch, end_epoch)
+
+    def close_window(self, window):
+        if self.histograms is not None:
+            self.histograms.flush_window(window)
+
+    def record(self, epoch_s, duration, status, server_timing, error, phase, extra="", phases=None,
+               window=None):
+        self.records += 1
+        # Um pedido cortado pelo scheduler nao e uma falha do servico: fica so no log
+        cancelled = isinstance(error, reqlog.RequestCancelled)
+        if self.live is not None and not cancelled:
+            self.live.record(duration, status, error)
+        if self.histograms is not None and window is not None and not cancelled:
+            self.histograms.record(window, duration, status, error)
+        self.write_record(epoch_s, duration, status, server_timing, error, phase, extra, phases)
+
+    def write_record(self, epoch_s, duration, status, server_timing, error, phase, extra, phases):
+        timestamp = datetime.fromtimestamp(epoch_s).isoformat()
+        if isinstance(error, reqlog.RequestCancelled):
+            self.put(f"{timestamp},CANCELLED,{error}\n")
+            return
+        if error is not None:
+            self.put(f"{timestamp},FAIL,{error}\n")
+            return
+        if phases is not None:
+            extra += "".join(f",{value * 1000:.3f}" for value in phases)
+        self.put(f"{timestamp},{duration:.3f},HTTP {status},{parse_server_timing(server_timing)}{extra}\n")
+
+    def put(self, message):
+        if len(self._buffer) >= self.max_queued:
+            self.dropped += 1
+            return
+        self._buffer.append(message)
+        self._buffered_bytes += len(message)
+        if self._buffered_bytes >= self.flush_bytes:
+            self._wakeup.set()
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        chunk, lines = self.joiner.join(self._buffer), len(self._buffer)
+        self._buffer = []
+        self._buffered_bytes = 0
+        await asyncio.get_running_loop().run_in_executor(None, write_log, self.log_file, chunk)
+        self.written += lines
+
+    async def close(self):
+        self._closed = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+
+
+class BinaryLogWriter(LogWriter):
+    """Same batching, but each request is a fixed-width reqlog record."""
+
+    joiner = b""
+
+    def __init__(self, log_file, trace=False, **kwargs):
+        super().__init__(log_file, trace, **kwargs)
+        self.version = 2 if trace else 1
+        if log_file.tell() == 0:
+            log_file.write(reqlog.header(self.version))
+        elif reqlog.read_header(log_file.name) != self.version:
+            raise ValueError(f"{log_file.name} was written with a different --trace setting; use another --log")
+
+    def note(self, text):
+        pass  # o formato binario so tem registos de pedidos e marcadores de fase
+
+    def phase_marker(self, event, phase, epoch_s):
+        kind = reqlog.MARKER_PHASE_START if event == "started" else reqlog.MARKER_PHASE_END
+        phases = (0.0,) * len(reqlog.TRACE_PHASES) if self.version == 2 else None
+        self.put(reqlog.pack(epoch_s, 0.0, 0, kind, phase, phases))
+
+    def write_record(self, epoch_s, duration, status, server_timing, error, phase, extra, phases):
+        if self.version == 2 and phases is None:
+            phases = (0.0,) * len(reqlog.TRACE_PHASES)
+        elif self.version == 1:
+            phases = None
+        self.put(reqlog.pack(epoch_s, duration, status or 0, classify_error(error), phase, phases))
+
+
+def classify_error(error):
+    """Map an exception raised by the client to one of reqlog.ERROR_CLASSES."""
+    if error is None:
+        return reqlog.ERROR_NONE
+    if isinstance(error, reqlog.GeneratorSaturated):
+        return reqlog.ERROR_SATURATED
+    if isinstance(error, reqlog.RequestCancelled):
+        return reqlog.ERROR_CANCELLED
+    if isinstance(error, asyncio.TimeoutError):
+        return reqlog.ERROR_TIMEOUT
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return reqlog.ERROR_CONNECT
+    if isinstance(error, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError)):
+        return reqlog.ERROR_DISCONNECT
+    if isinstance(error, aiohttp.ClientError):
+        return reqlog.ERROR_CLIENT
+    return reqlog.ERROR_OTHER
+
+
+LOG_WRITERS = {"text": ("a", LogWriter), "binary": ("ab", BinaryLogWriter)}
+
+
+# Escreve de forma síncrona um bloco de linhas de log, com um so write e um so flush.
+def write_log(log_file, chunk):
+    log_file.write(chunk)
+    log_file.flush()
+
+
+# Hooks do aiohttp que marcam o instante (monotonic) de cada evento do pedido
+# no dict passado em trace_request_ctx
+TRACE_SIGNALS = {
+    "on_connection_queued_start": "queued_start",
+    "on_connection_queued_end": "queued_end",
+    "on_dns_resolvehost_start": "dns_start",
+    "on_dns_resolvehost_end": "dns_end",
+    "on_connection_create_start": "create_start",
+    "on_connection_create_end": "create_end",
+    "on_request_headers_sent": "headers_sent",
+    "on_request_end": "request_end",
+}
+
+
+def make_trace_config():
+    trace_config = aiohttp.TraceConfig()
+
+    def stamp(name):
+        async def hook(session, context, params):
+            if context.trace_request_ctx is not None:
+                context.trace_request_ctx[name] = time.monotonic()
+        return hook
+
+    for signal, name in TRACE_SIGNALS.items():
+        getattr(trace_config, signal).append(stamp(name))
+    return trace_config
+
+
+def trace_phases(marks, start_time, body_end):
+    """Split one request into reqlog.TRACE_PHASES (seconds); 0 for phases that did not happen."""
+    def span(start, end):
+        return marks[end] - marks[start] if start in marks and end in marks else 0.0
+
+    dns = span("dns_start", "dns_end")
+    connect = max(span("create_start", "create_end") - dns, 0.0)
+    headers_end = marks.get("request_end", body_end)
+    ttfb = headers_end - marks.get("headers_sent", start_time)
+    return span("queued_start", "queued_end"), dns, connect, ttfb, body_end - headers_end
+
+
+# Faz um pedido GET e devolve (duracao, HTTP code, header Server-Timing, erro, fases);
+# as fases so existem com --trace (make_trace_config instalado na sessao)
+async def request_once(session, url, start_time):
+    marks = {}
+    try:
+        async with session.get(url, trace_request_ctx=marks) as response:
+            await response.text()  # Consume response
+            end_time = time.monotonic()
+            phases = trace_phases(marks, start_time, end_time) if marks else None
+            return end_time - start_time, response.status, response.headers.get("Server-Timing"), None, phases
+    except Exception as e:
+        return time.monotonic() - start_time, 0, None, e, None
+
+
+class ConnectionStrategy:
+    """One aiohttp session configured as `fresh`, `pool[:N]` or `prewarmed:N`, with reuse counters."""
+
+    KINDS = ("fresh", "pool", "prewarmed")
+
+    def __init__(self, spec):
+        kind, _, size = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown connection strategy {spec!r}; expected one of {self.KINDS}")
+        if kind == "prewarmed" and not size:
+            raise ValueError("prewarmed needs a size, e.g. prewarmed:265")
+        self.spec, self.kind, self.size = spec, kind, int(size or 0)
+        self.session = None
+        self.requests = 0
+        self.new_connections = 0
+        self.reused = 0
+        self.prewarms = 0
+
+    def open(self, trace):
+        if self.kind == "fresh":
+            connector = aiohttp.TCPConnector(limit=0, force_close=True)
+        else:
+            connector = aiohttp.TCPConnector(limit=self.size)
+        trace_configs = [self._counting_trace_config()]
+        if trace:
+            trace_configs.append(make_trace_config())
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=CONNECTION_TIMEOUT,
+            auto_decompress=True,
+            trace_configs=trace_configs
+        )
+
+    def _counting_trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+
+        async def created(session, context, params):
+            self.new_connections += 1
+
+        async def reused(session, context, params):
+            self.reused += 1
+
+        trace_config.on_connection_create_end.append(created)
+        trace_config.on_connection_reuseconn.append(reused)
+        return trace_config
+
+    async def prewarm(self, url, log=None):
+        """Open `size` keep-alive connections with concurrent GETs to PREWARM_PATH on the same origin.
+
+        The target path is not used, so warming does not add a compute burst ahead
+        of the phase; with `log`, a note records when it happened and how many succeeded.
+        """
+        self.prewarms += 1
+        target = urlsplit(url)._replace(path=PREWARM_PATH, query="").geturl()
+
+        async def touch():
+            try:
+                async with self.session.get(target) as response:
+                    await response.read()
+                    return response.status < 500
+            except Exception:
+                return False
+
+        started = datetime.now().isoformat()
+        ok = sum(await asyncio.gather(*(touch() for _ in range(self.size))))
+        if log is not None:
+            log.note(f"Prewarm {self.spec}: {ok}/{self.size} connections via {PREWARM_PATH} at {started}")
+
+    def stats(self):
+        return {
+            "spec": self.spec,
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused": self.reused,
+            "prewarms": self.prewarms,
+        }
+
+
+class Connections:
+    """Connection strategy per shape phase; phases without their own strategy share the default."""
+
+    def __init__(self, default="pool", per_phase=None, trace=False):
+        self.default = ConnectionStrategy(default)
+        self.per_phase = {int(phase): ConnectionStrategy(spec) for phase, spec in (per_phase or {}).items()}
+        self.trace = trace
+
+    def strategies(self):
+        return [("default", self.default)] + [(f"phase {p}", st) for p, st in sorted(self.per_phase.items())]
+
+    def open(self):
+        for _, strategy in self.strategies():
+            strategy.open(self.trace)
+
+    async def close(self):
+        for _, strategy in self.strategies():
+            await strategy.session.close()
+
+    def strategy_for(self, phase):
+        return self.per_phase.get(phase, self.default)
+
+    def session_for(self, phase):
+        return self.strategy_for(phase).session
+
+    async def prewarm_loop(self, shape, url, log, start_time, duration, warmed=None):
+        """Warm `prewarmed` strategies PREWARM_LEAD seconds before each occurrence of their phase.
+
+        `warmed` is the phase already warmed before the start, so it is not warmed twice.
+        """
+        while True:
+            elapsed = time.monotonic() - start_time
+            if elapsed >= duration:
+                return
+            upcoming = phase_of(shape, elapsed + PREWARM_LEAD)
+            strategy = self.strategy_for(upcoming)
+            if strategy.kind == "prewarmed" and upcoming != warmed and elapsed + PREWARM_LEAD < duration:
+                await strategy.prewarm(url, log)
+            warmed = upcoming
+            await asyncio.sleep(CONTROL_INTERVAL)
+
+    def stats(self):
+        return {label: strategy.stats() for label, strategy in self.strategies()}
+
+
+# Closed-loop: envia pedidos continuamente ate o scheduler marcar `stop` (reducao
+# de workers dentro da fase: o pedido em curso termina e fica no log, para nao
+# perder precisamente os pedidos lentos) ou o cancelar no fim da fase; um pedido
+# ainda em voo nesse prazo (phase_over marcado) fica registado como CANCELLED.
+async def worker(connections, url, log, think_time, phase, window, phase_over, stop):
+    session = connections.session_for(phase)
+    while not stop.is_set():
+        start_time = time.monotonic()
+        epoch_s = time.time()
+        connections.strategy_for(phase).requests += 1
+        try:
+            duration, status, server_timing, error, phases = await request_once(session, url, start_time)
+        except asyncio.CancelledError:
+            if phase_over.is_set():
+                log.record(epoch_s, time.monotonic() - start_time, 0, None,
+                           reqlog.RequestCancelled("cancelled at the phase boundary"), phase, window=window)
+            raise
+        log.record(epoch_s, duration, status, server_timing, error, phase, phases=phases, window=window)
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+# Open-loop: um pedido agendado para o instante `intended` (time.monotonic).
+# A duracao e medida desde o instante previsto, nao desde o envio real.
+async def scheduled_request(session, url, log, intended, epoch_s, phase, window):
+    sent = time.monotonic()
+    duration, status, server_timing, error, phases = await request_once(session, url, intended)
+    service = time.monotonic() - sent
+    log.record(epoch_s, duration, status, server_timing, error, phase,
+               extra=f",{service:.3f},{(sent - intended) * 1000:.3f}", phases=phases, window=window)
+
+
+def log_status(log):
+    return f"Log queued: {log.queued} dropped: {log.dropped}"
+
+
+class LiveStats:
+    """Rolling one-second window for the console: RPS, p50/p95/p99 and error rate.
+
+    Latencies go into a Histogram, so recording is O(1) and windows from several
+    processes merge by adding bucket counts. Errors are client failures plus 5xx.
+    """
+
+    def __init__(self):
+        self._reset(time.monotonic())
+
+    def _reset(self, now):
+        self.window = Histogram()
+        self.failed = 0
+        self.server_errors = 0
+        self.window_start = now
+
+    def record(self, duration, status, error):
+        if error is not None:
+            self.failed += 1
+            return
+        self.window.record(duration)
+        if status >= 500:
+            self.server_errors += 1
+
+    def roll(self):
+        """Close the current window: (histogram, failed, server_errors, seconds)."""
+        now = time.monotonic()
+        window = (self.window, self.failed, self.server_errors, now - self.window_start)
+        self._reset(now)
+        return window
+
+
+def format_live(histogram, failed, server_errors, seconds):
+    if seconds < 0.5:
+        return "RPS - | p50/p95/p99 - | err -"  # janela ainda a comecar
+    requests = histogram.total + failed
+    p50, p95, p99 = (value * 1000 for value in histogram.percentiles([0.5, 0.95, 0.99]))
+    error_rate = (failed + server_errors) / requests * 100 if requests else 0.0
+    return (f"RPS {requests / max(seconds, 1e-9):.0f} | p50/p95/p99 {p50:.1f}/{p95:.1f}/{p99:.1f}ms | "
+            f"err {error_rate:.1f}%")
+
+
+def live_status(log):
+    return f"{format_live(*log.live.roll())} | {log_status(log)}"
+
+
+# Reescreve a linha de estado no mesmo sitio, cortada a largura do terminal para o \r funcionar
+def refresh(line):
+    width = shutil.get_terminal_size().columns - 1
+    print("\r" + line[:width].ljust(width), end="", flush=True)
+
+
+# Multi-processo: cada processo envia a sua janela de um segundo ao coordenador
+async def publish_live(live, queue):
+    while True:
+        await asyncio.sleep(1)
+        histogram, failed, server_errors, seconds = live.roll()
+        queue.put((histogram.sparse(), histogram.max_us, failed, server_errors))
+
+
+
+async def sleep_until(deadline):
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def closed_loop(connections, shape, url, log, duration, think_time, start_time, report=True,
+                      phase_markers=True):
+    """Run the planned phases; within one, resize the worker pool every CONTROL_INTERVAL.
+
+    Workers removed by a lower target finish and log their current request before exiting.
+
+    Each phase ends exactly at its planned deadline: all its workers are cancelled
+    (requests in flight are logged as CANCELLED) and the next phase starts with fresh workers.
+    """
+    start_wall = time.time() + (start_time - time.monotonic())
+    next_report = 0
+    for window, (phase_start, phase_end, phase) in enumerate(plan_phases(shape, duration)):
+        await sleep_until(start_time + phase_start)
+        if phase_markers:
+            log.phase_marker("started", phase, start_wall + phase_start)
+        log.open_window(window, phase, start_wall + phase_start, start_wall + phase_end)
+        deadline = start_time + phase_end
+        phase_over = asyncio.Event()
+        workers = []        # (task, stop)
+        stopping = set()    # workers retirados a acabar o pedido em curso
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                elapsed = now - start_time
+                target = shape.concurrency_at(elapsed)
+                while len(workers) < target:
+                    stop = asyncio.Event()
+                    task = asyncio.create_task(worker(connections, url, log, think_time, phase, window,
+                                                      phase_over, stop))
+                    workers.append((task, stop))
+                while len(workers) > target:
+                    task, stop = workers.pop()
+                    stop.set()
+                    stopping.add(task)
+                    task.add_done_callback(stopping.discard)
+                if report and elapsed >= next_report:
+                    # apenas para visualizar se der erro in real time.
+                    refresh(f"Phase: {phase} | Active: {len(workers)} | Elapsed: {int(elapsed)}s | "
+                            f"Remaining: {int(duration - elapsed)}s | {live_status(log)}")
+                    next_report = int(elapsed) + 1
+                await sleep_until(min(now + CONTROL_INTERVAL, deadline))
+        finally:
+            phase_over.set()
+            tasks = [task for task, _ in workers] + list(stopping)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if phase_markers:
+            log.phase_marker("ended", phase, start_wall + phase_end)
+        log.close_window(window)
+
+
+async def open_loop(connections, shape, url, log, duration, start, report=True, phase_markers=True):
+    """Send requests at shape.concurrency_at(t) per second, independent of completions.
+
+    Send times follow a fixed schedule that restarts at each planned phase boundary;
+    if the loop falls behind, late requests go out immediately and the lag is logged
+    instead of silently thinning the load.
+    """
+    in_flight = set()
+    start_wall = time.time() + (start - time.monotonic())
+    next_report = 0
+    saturated = 0
+    # pedidos ainda em voo por janela: o histograma de uma janela so e gravado
+    # depois de a fase acabar e de todos os seus pedidos terminarem
+    pending = Counter()
+    closed = []
+    for window, (phase_start, phase_end, phase) in enumerate(plan_phases(shape, duration)):
+        intended = start + phase_start
+        await sleep_until(intended)
+        if phase_markers:
+            log.phase_marker("started", phase, start_wall + phase_start)
+        log.open_window(window, phase, start_wall + phase_start, start_wall + phase_end)
+
+        def finished(task, window=window):
+            in_flight.discard(task)
+            pending[window] -= 1
+
+        session = connections.session_for(phase)
+        strategy = connections.strategy_for(phase)
+        while True:
+            elapsed = intended - start
+            if elapsed >= phase_end - 1e-9:  # somas de 1/rate podem ficar um epsilon abaixo da fronteira
+                break
+            rate = shape.concurrency_at(elapsed)
+            delay = intended - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)  # atrasado: envia ja, mas deixa correr os pedidos em voo
+            # antes do teste da taxa, para a linha de estado continuar a andar numa fase a 0/s
+            if report and elapsed >= next_report:
+                lag_ms = (time.monotonic() - intended) * 1000
+                refresh(f"Phase: {phase} | Rate: {rate}/s | In flight: {len(in_flight)} | Lag: {lag_ms:.1f}ms | "
+                        f"Elapsed: {int(elapsed)}s | Remaining: {int(duration - elapsed)}s | {live_status(log)}")
+                next_report = int(elapsed) + 1
+            if rate <= 0:
+                intended += CONTROL_INTERVAL
+                continue
+            epoch_s = start_wall + elapsed
+            if len(in_flight) >= MAX_OUTSTANDING:
+                saturated += 1
+                error = reqlog.GeneratorSaturated(f"load generator saturated ({MAX_OUTSTANDING} in flight)")
+                log.record(epoch_s, 0.0, 0, None, error, phase, window=window)
+            else:
+                strategy.requests += 1
+                task = asyncio.create_task(scheduled_request(session, url, log, intended, epoch_s, phase, window))
+                in_flight.add(task)
+                pending[window] += 1
+                task.add_done_callback(finished)
+            intended += 1 / rate
+        if phase_markers:
+            log.phase_marker("ended", phase, start_wall + phase_end)
+        closed.append(window)
+        for done in [w for w in closed if not pending[w]]:
+            log.close_window(done)
+            closed.remove(done)
+    # Espera pelos pedidos ainda em voo (limitados pelo CONNECTION_TIMEOUT):
+    # cancela-los deitaria fora precisamente as respostas mais lentas.
+    await asyncio.gather(*in_flight, return_exceptions=True)
+    for window in closed:
+        log.close_window(window)
+    return saturated
+
+
+# Mede o atraso do event loop: quanto mais um sleep curto demora do que devia
+async def monitor_loop(lags, interval=CONTROL_INTERVAL):
+    while True:
+        before = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(time.monotonic() - before - interval)
+
+
+async def run(shape, url=TARGET_URL, duration=RUN_DURATION, log_path=LOG_FILE,
+              think_time=0.0, connection="pool", open_loop_mode=False, log_format="text",
+              start_at=None, report=True, trace=False, phase_connections=None, phase_markers=True,
+              live_queue=None, run_id=None):
+    """Drive `shape` against `url` for `duration` seconds on one event loop and one session.
+
+    Closed-loop (default): the shape is the number of concurrent workers.
+    Open-loop: the shape is the arrival rate in requests per second.
+    `connection` is the default ConnectionStrategy spec, `phase_connections` maps phase ids to specs.
+    `start_at` is a time.monotonic() deadline shared by all processes of a multi-process run
+    and is the origin of the phase plan, and `live_queue` receives their one-second LiveStats windows.
+    `run_id` (shared by those processes, default: now in ns) tags this run's blocks in <log>.hist.
+    Returns the generator stats used by the bottleneck check.
+    """
+    mode, writer = LOG_WRITERS[log_format]
+    with open(log_path, mode) as log_file:
+        log = writer(log_file, trace)
+        log.live = LiveStats()
+        run_id = run_id or time.time_ns()
+        log.histograms = HistogramWriter(log_path + HIST_SUFFIX, run_id)
+        log.start()
+        connections = Connections(connection, phase_connections, trace)
+        connections.open()
+        first_phase = phase_of(shape, 0)
+        first = connections.strategy_for(first_phase)
+        if first.kind == "prewarmed":
+            await first.prewarm(url, log)
+        # Com start_at o plano de fases parte do prazo comum do coordenador, mesmo que
+        # este processo tenha arrancado (ou aquecido ligacoes) mais tarde
+        start_time = start_at if start_at is not None else time.monotonic()
+        await sleep_until(start_time)
+        log.note(f"Simulation started at {datetime.now().isoformat()}")
+        cpu_start = time.process_time()
+        lags = []
+        monitor = asyncio.create_task(monitor_loop(lags))
+        prewarmer = asyncio.create_task(connections.prewarm_loop(shape, url, log, start_time, duration,
+                                                                   warmed=first_phase))
+        log.live.roll()
+        publisher = asyncio.create_task(publish_live(log.live, live_queue)) if live_queue is not None else None
+        saturated = 0
+        try:
+            if open_loop_mode:
+                saturated = await open_loop(connections, shape, url, log, duration, start_time, report,
+                                            phase_markers)
+            else:
+                await closed_loop(connections, shape, url, log, duration, think_time, start_time, report,
+                                  phase_markers)
+        finally:
+            monitor.cancel()
+            prewarmer.cancel()
+            if publisher is not None:
+                publisher.cancel()
+            await asyncio.gather(prewarmer, return_exceptions=True)
+            await connections.close()
+        elapsed = time.monotonic() - start_time
+
+        if report:
+            print(f"\nSimulation stopped after {int(elapsed)}s.")
+        log.note(f"Simulation stopped at {datetime.now().isoformat()}")
+        await log.close()
+        log.histograms.close()
+
+    lags.sort()
+    return {
+        "pid": os.getpid(),
+        "run_id": run_id,
+        "requests": log.records,
+        "dropped": log.dropped,
+        "saturated": saturated,
+        "elapsed": elapsed,
+        "cpu": (time.process_time() - cpu_start) / max(elapsed, 1e-9),
+        "loop_lag_p99_ms": lags[int(0.99 * (len(lags) - 1))] * 1000 if lags else 0.0,
+        "loop_lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+        "connections": connections.stats(),
+    }
+
+
+def report_generator(stats, hist_path=None):
+    """Print per-process generator stats and warn when the generator is the bottleneck.
+
+    With `hist_path`, also print the per-phase latency summary from this run's histograms
+    (earlier runs appended to the same file are left out).
+    """
+    bottleneck = False
+    for i, st in enumerate(stats):
+        print(f"Generator {i} (pid {st['pid']}): {st['requests']} requests "
+              f"({st['requests'] / max(st['elapsed'], 1e-9):.0f}/s) | CPU {st['cpu'] * 100:.0f}% | "
+              f"loop lag p99 {st['loop_lag_p99_ms']:.1f}ms max {st['loop_lag_max_ms']:.1f}ms | "
+              f"log dropped {st['dropped']}")
+        for label, conn in st["connections"].items():
+            if not conn["requests"] and not conn["prewarms"]:
+                continue
+            reuse = conn["reused"] / max(conn["reused"] + conn["new_connections"], 1)
+            print(f"  Connections {label} ({conn['spec']}): {conn['requests']} requests | "
+                  f"{conn['new_connections']} opened | {conn['reused']} reused ({reuse * 100:.0f}%) | "
+                  f"{conn['prewarms']} prewarms")
+        if st["saturated"]:
+            print(f"  {st['saturated']} requests not sent, more than {MAX_OUTSTANDING} in flight")
+        if st["cpu"] >= CPU_WARN or st["loop_lag_p99_ms"] >= LOOP_LAG_WARN_MS or st["saturated"]:
+            bottleneck = True
+    if bottleneck:
+        print("Warning: the load generator itself was saturated; latencies include client-side delay. "
+              "Use more --processes (or --uvloop).")
+    if hist_path and os.path.exists(hist_path):
+        print(f"Latency by phase and status class ({hist_path}):")
+        for line in summary_lines(hist_path, run=stats[0]["run_id"]):
+            print(f"  {line}")
+
+
+class ShareOf:
+    """The `index`-th of `count` even integer shares of another shape."""
+
+    def __init__(self, shape, index, count):
+        self.shape, self.index, self.count = shape, index, count
+
+    def concurrency_at(self, t):
+        total = self.shape.concurrency_at(t)
+        return total // self.count + (1 if self.index < total % self.count else 0)
+
+    def phase_at(self, t):
+        return phase_of(self.shape, t)
+
+    def boundaries(self, duration):
+        boundaries = getattr(self.shape, "boundaries", None)
+        return boundaries(duration) if boundaries else []
+
+
+def use_uvloop():
+    try:
+        import uvloop
+    except ImportError:
+        print("uvloop not installed, using the default asyncio event loop")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def share_spec(spec, index, count):
+    """The `index`-th share of a sized connection spec, so N processes open N * size / N connections."""
+    kind, _, size = spec.partition(":")
+    if not size:
+        return spec
+    size = int(size)
+    return f"{kind}:{max(1, size // count + (1 if index < size % count else 0))}"
+
+
+# Corpo de cada processo do modo multi-processo: corre a sua parte da forma
+# ate ao mesmo prazo monotonic que os outros, num log parcial
+def run_share(index, count, shape, start_at, uvloop, live_queue, run_kwargs):
+    if uvloop:
+        use_uvloop()
+    run_kwargs = dict(run_kwargs)
+    run_kwargs["connection"] = share_spec(run_kwargs.get("connection", "pool"), index, count)
+    run_kwargs["phase_connections"] = {
+        phase: share_spec(spec, index, count)
+        for phase, spec in (run_kwargs.get("phase_connections") or {}).items()
+    }
+    # so o primeiro processo escreve os marcadores de fase, para nao os repetir no log junto
+    return asyncio.run(run(ShareOf(shape, index, count), start_at=start_at, report=False,
+                           phase_markers=index == 0, live_queue=live_queue, **run_kwargs))
+
+
+# Chave de ordenacao das linhas de texto no merge multi-processo: o timestamp ISO
+# (ordena como texto), no inicio das linhas de pedidos ou depois do ultimo " at "
+# nas notas (marcadores de fase, prewarm), que assim ficam no sitio certo do log
+def merge_key(line):
+    if line[:1].isdigit():
+        return line.split(",", 1)[0]
+    return line.rsplit(" at ", 1)[-1].rstrip()
+
+
+def merge_logs(log_path, parts, log_format, started):
+    """Append the partial logs to `log_path`: text lines merged by timestamp, binary records concatenated."""
+    if log_format == "binary":
+        version = reqlog.read_header(parts[0])
+        if os.path.exists(log_path) and os.path.getsize(log_path) and reqlog.read_header(log_path) != version:
+            # os logs parciais ficam no disco, o run nao se perde
+            raise ValueError(f"{log_path} was written with a different --trace setting; use another --log "
+                             f"(partial logs kept: {', '.join(parts)})")
+        with open(log_path, "ab") as out:
+            if out.tell() == 0:
+                out.write(reqlog.header(version))
+            for part in parts:
+                with open(part, "rb") as f:
+                    f.seek(reqlog.HEADER.size)
+                    shutil.copyfileobj(f, out)
+    else:
+        files = [open(part, "r") for part in parts]
+        try:
+            lines = [(line for line in f if not line.startswith("Simulation ")) for f in files]
+            with open(log_path, "a") as out:
+                out.write(f"Simulation started at {started}\n")
+                out.writelines(heapq.merge(*lines, key=merge_key))
+                out.write(f"Simulation stopped at {datetime.now().isoformat()}\n")
+        finally:
+            for f in files:
+                f.close()
+    with open(log_path + HIST_SUFFIX, "ab") as out:
+        for part in parts:
+            append_blocks(part + HIST_SUFFIX, out)
+    for part in parts:
+        os.remove(part)
+        os.remove(part + HIST_SUFFIX)
+
+
+def run_processes(processes, shape, log_path=LOG_FILE, log_format="text", uvloop=False, **run_kwargs):
+    """Coordinator: split `shape` over `processes` event loops and merge their logs.
+
+    `run_kwargs` are passed to run() in every process.
+    """
+    duration = run_kwargs.get("duration", RUN_DURATION)
+    if log_format == "binary" and os.path.exists(log_path) and os.path.getsize(log_path):
+        # mesma verificacao do BinaryLogWriter, antes do run e nao so no merge final
+        if reqlog.read_header(log_path) != (2 if run_kwargs.get("trace") else 1):
+            raise ValueError(f"{log_path} was written with a different --trace setting; use another --log")
+    check_file(log_path + HIST_SUFFIX)
+    run_id = time.time_ns()
+    started = datetime.now().isoformat()
+    start_at = time.monotonic() + STARTUP_GRACE
+    parts = [f"{log_path}.part{i}" for i in range(processes)]
+    # logs parciais de um run anterior cujo merge falhou: nao os misturar com este
+    leftover = [path for part in parts for path in (part, part + HIST_SUFFIX) if os.path.exists(path)]
+    if leftover:
+        raise ValueError(f"partial logs from an earlier run still exist: {', '.join(leftover)}")
+    context = multiprocessing.get_context("spawn")
+    with context.Manager() as manager, ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        live_queue = manager.Queue()
+        futures = [
+            pool.submit(run_share, i, processes, shape, start_at, uvloop, live_queue,
+                        dict(run_kwargs, log_path=parts[i], log_format=log_format, run_id=run_id))
+            for i in range(processes)
+        ]
+        last = time.monotonic()
+        while not all(future.done() for future in futures):
+            time.sleep(1)
+            # junta as janelas de um segundo que os processos enviaram desde a ultima linha
+            histogram, failed, server_errors = Histogram(), 0, 0
+            while not live_queue.empty():
+                buckets, max_us, window_failed, window_server_errors = live_queue.get()
+                histogram.merge_sparse(buckets, max_us)
+                failed += window_failed
+                server_errors += window_server_errors
+            now = time.monotonic()
+            elapsed = max(0.0, now - start_at)
+            refresh(f"Processes: {processes} | Target: {shape.concurrency_at(elapsed)} | "
+                    f"Elapsed: {int(elapsed)}s | Remaining: {int(max(0.0, duration - elapsed))}s | "
+                    f"{format_live(histogram, failed, server_errors, now - last)}")
+            last = now
+        stats = [future.result() for future in futures]
+    print(f"\nSimulation stopped after {int(time.monotonic() - start_at)}s.")
+    merge_logs(log_path, parts, log_format, started)
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Traffic-shape load generator for knative-fn4")
+    parser.add_argument("--url", default=TARGET_URL)
+    parser.add_argument("--duration", type=float, default=RUN_DURATION, help="Total run time in seconds")
+    parser.add_argument("--log", default=LOG_FILE)
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds each worker sleeps between requests")
+    parser.add_argument("--force-close", action="store_true", help="New TCP connection per request (= --connection fresh)")
+    parser.add_argument("--connection", default="pool",
+                        help="Connection strategy: fresh, pool[:N] or prewarmed:N (default: unbounded keep-alive pool)")
+    parser.add_argument("--phase-connection", action="append", default=[], metavar="PHASE=STRATEGY",
+                        help="Connection strategy for one shape phase, e.g. 1=prewarmed:265 (repeatable)")
+    parser.add_argument("--open-loop", action="store_true",
+                        help="Treat the shape as an arrival rate (requests/s) instead of a worker count")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Generator processes, each with its own event loop and 1/N of the shape")
+    parser.add_argument("--uvloop", action="store_true", help="Use uvloop when installed")
+    parser.add_argument("--trace", action="store_true",
+                        help="Log per-request acquire/DNS/connect/TTFB/body times (aiohttp TraceConfig)")
+    parser.add_argument("--log-format", choices=sorted(LOG_WRITERS), default="text",
+                        help="binary: fixed-width records readable with reqlog.read_records()")
+    parser.add_argument("--schedule", help="JSON/YAML file with a shape spec; overrides --shape and its options")
+    parser.add_argument("--shape", choices=sorted(SHAPES), default="yoyo")
+    parser.add_argument("--concurrency", type=int, default=1, help="constant")
+    parser.add_argument("--high", type=int, default=265, help="yoyo, poisson")
+    parser.add_argument("--low", type=int, default=0, help="yoyo, poisson")
+    parser.add_argument("--on", type=float, default=35, help="yoyo, poisson: seconds at --high")
+    parser.add_argument("--off", type=float, default=900, help="yoyo: seconds at --low")
+    parser.add_argument("--start", type=int, default=0, help="ramp")
+    parser.add_argument("--end", type=int, default=265, help="ramp")
+    parser.add_argument("--ramp-duration", type=float, default=600, help="ramp")
+    parser.add_argument("--mean", type=float, default=100, help="sinusoid")
+    parser.add_argument("--amplitude", type=float, default=80, help="sinusoid")
+    parser.add_argument("--period", type=float, default=900, help="sinusoid")
+    parser.add_argument("--mean-interval", type=float, default=600, help="poisson: mean seconds between bursts")
+    parser.add_argument("--seed", type=int, default=0, help="poisson")
+    return parser.parse_args()
+
+
+def shape_from_args(args):
+    if args.schedule:
+        return build_shape(load_schedule(args.schedule))
+    specs = {
+        "constant": {"concurrency": args.concurrency},
+        "yoyo": {"high": args.high, "low": args.low, "on": args.on, "off": args.off},
+        "ramp": {"start": args.start, "end": args.end, "duration": args.ramp_duration},
+        "sinusoid": {"mean": args.mean, "amplitude": args.amplitude, "period": args.period},
+        "poisson": {"mean_interval": args.mean_interval, "high": args.high, "on": args.on,
+                    "low": args.low, "seed": args.seed},
+    }
+    if args.shape not in specs:
+        raise SystemExit(f"--shape {args.shape} needs a --schedule file")
+    return build_shape({"shape": args.shape, **specs[args.shape]})
+
+
+def main():
+    args = parse_args()
+    shape = shape_from_args(args)
+    mode = "open-loop, requests/s" if args.open_loop else "closed-loop, workers"
+    print(f"Async load generator ({type(shape).__name__}, {mode}, {int(args.duration)}s)")
+    print(f"Target: {args.url}")
+    phase_connections = {}
+    for item in args.phase_connection:
+        phase, _, spec = item.partition("=")
+        phase_connections[int(phase)] = spec
+    run_kwargs = {
+        "url": args.url,
+        "duration": args.duration,
+        "think_time": args.think_time,
+        "connection": "fresh" if args.force_close else args.connection,
+        "phase_connections": phase_connections,
+        "open_loop_mode": args.open_loop,
+        "trace": args.trace,
+    }
+    try:
+        if args.processes > 1:
+            stats = run_processes(args.processes, shape, args.log, args.log_format, args.uvloop, **run_kwargs)
+        else:
+            if args.uvloop:
+                use_uvloop()
+            stats = [asyncio.run(run(shape, log_path=args.log, log_format=args.log_format, **run_kwargs))]
+        report_generator(stats, args.log + HIST_SUFFIX)
+    except KeyboardInterrupt:
+        print("\nLoad generation stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+reqlog.py
+
+Formato binario compacto dos logs do loadgen.py (--log-format binary) e o
+leitor correspondente. Cada pedido e um registo de largura fixa (16 bytes):
+
+    ts_ns    int64    epoch em nanosegundos (instante previsto, no modo open-loop)
+    latency  float32  segundos
+    status   uint16   HTTP status (0 quando o pedido falhou)
+    error    uint8    classe de erro, ver ERROR_CLASSES
+    phase    uint8    fase da forma de trafego (ex.: 1 = ataque, 0 = pausa no yo-yo)
+
+Com --trace (versao 2, 36 bytes) cada registo leva ainda as fases do pedido
+do lado do cliente, em segundos float32 (ver TRACE_PHASES):
+
+    acquire  espera por uma ligacao livre no pool do aiohttp
+    dns      resolucao do host
+    connect  TCP (+TLS) connect, sem o DNS
+    ttfb     headers enviados -> headers da resposta recebidos
+    body     leitura do body
+
+As fronteiras de fase sao registos marcadores (error = MARKER_PHASE_START ou
+MARKER_PHASE_END, ts_ns = instante planeado da fronteira); phase_windows() le-os
+e requests_only() devolve so os pedidos.
+
+O ficheiro comeca com um header de 16 bytes (magic, versao, tamanho do registo),
+por isso o leitor mapeia o resto diretamente num array estruturado NumPy, sem
+fazer parsing de texto.
+
+Usage:
+    python automation/attack/reqlog.py logs/attack_metrics.bin
+    python automation/attack/reqlog.py logs/attack_metrics.bin --csv > attack_metrics.csv
+"""
+
+import argparse
+import os
+import struct
+import sys
+from datetime import datetime
+
+MAGIC = b"FIBREQ\0\0"
+HEADER = struct.Struct("<8sII")          # magic, version, record size
+RECORDS = {
+    1: struct.Struct("<qfHBB"),          # ts_ns, latency, status, error, phase
+    2: struct.Struct("<qfHBBfffff"),     # ... + TRACE_PHASES
+}
+TRACE_PHASES = ("acquire", "dns", "connect", "ttfb", "body")
+
+ERROR_NONE = 0
+ERROR_TIMEOUT = 1
+ERROR_CONNECT = 2
+ERROR_DISCONNECT = 3
+ERROR_CLIENT = 4
+ERROR_SATURATED = 5
+ERROR_CANCELLED = 6
+ERROR_OTHER = 255
+
+MARKER_PHASE_START = 240
+MARKER_PHASE_END = 241
+
+ERROR_CLASSES = {
+    ERROR_NONE: "ok",
+    ERROR_TIMEOUT: "timeout",
+    ERROR_CONNECT: "connect",
+    ERROR_DISCONNECT: "disconnect",
+    ERROR_CLIENT: "client",
+    ERROR_SATURATED: "saturated",
+    ERROR_CANCELLED: "cancelled",
+    ERROR_OTHER: "other",
+}
+
+
+class GeneratorSaturated(Exception):
+    """The load generator skipped a scheduled request (too many in flight)."""
+
+
+class RequestCancelled(Exception):
+    """A request still in flight when the scheduler cancelled its worker."""
+
+
+def header(version=1):
+    return HEADER.pack(MAGIC, version, RECORDS[version].size)
+
+
+def read_header(path):
+    """Return the format version of an existing log file."""
+    with open(path, "rb") as f:
+        raw = f.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{path}: truncated header")
+    magic, version, record_size = HEADER.unpack(raw)
+    if magic != MAGIC or version not in RECORDS or record_size != RECORDS[version].size:
+        raise ValueError(f"{path}: not a request log (magic={magic!r}, version={version})")
+    return version
+
+
+def pack(epoch_s, latency, status, error_class, phase, phases=None):
+    if phases is None:
+        return RECORDS[1].pack(int(epoch_s * 1e9), latency, status, error_class, phase)
+    return RECORDS[2].pack(int(epoch_s * 1e9), latency, status, error_class, phase, *phases)
+
+
+def record_dtype(version=1):
+    import numpy as np
+
+    fields = [
+        ("ts_ns", "<i8"),
+        ("latency", "<f4"),
+        ("status", "<u2"),
+        ("error", "u1"),
+        ("phase", "u1"),
+    ]
+    if version >= 2:
+        fields += [(name, "<f4") for name in TRACE_PHASES]
+    return np.dtype(fields)
+
+
+def read_records(path):
+    """Memory-map a binary request log as a NumPy structured array (read-only)."""
+    import numpy as np
+
+    dtype = record_dtype(read_header(path))
+    # Um registo incompleto no fim (escrita interrompida) e ignorado
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+
+def requests_only(records):
+    """Drop the phase marker records (only those: ERROR_OTHER is above the marker values)."""
+    import numpy as np
+
+    if not len(records):
+        return records
+    return records[~np.isin(records["error"], (MARKER_PHASE_START, MARKER_PHASE_END))]
+
+
+def phase_windows(records):
+    """[(phase, start_ns, end_ns), ...] from the phase markers, in time order."""
+    import numpy as np
+
+    starts = records[records["error"] == MARKER_PHASE_START]
+    ends = records[records["error"] == MARKER_PHASE_END]
+    starts = starts[np.argsort(starts["ts_ns"], kind="stable")]
+    ends = ends[np.argsort(ends["ts_ns"], kind="stable")]
+    return [(int(s["phase"]), int(s["ts_ns"]), int(e["ts_ns"])) for s, e in zip(starts, ends)]
+
+
+def summarize(records):
+    import numpy as np
+
+    windows = phase_windows(records)
+    records = requests_only(records)
+    print(f"Requests: {len(records)}")
+    if not len(records):
+        return
+    start, end = records["ts_ns"].min(), records["ts_ns"].max()
+    print(f"From {datetime.fromtimestamp(start / 1e9).isoformat()} to {datetime.fromtimestamp(end / 1e9).isoformat()}")
+    ok = records["error"] == ERROR_NONE
+    # cortados pelo scheduler na fronteira de fase: nem sucesso nem falha do servico
+    cancelled = records["error"] == ERROR_CANCELLED
+    for phase in np.unique(records["phase"]):
+        in_phase = records["phase"] == phase
+        latency = records["latency"][in_phase & ok]
+        line = (f"Phase {phase}: {in_phase.sum()} requests, {(in_phase & ~ok & ~cancelled).sum()} failed, "
+                f"{(in_phase & cancelled).sum()} cancelled")
+        if len(latency):
+            p50, p95, p99 = np.percentile(latency, [50, 95, 99]) * 1000
+            line += f", p50 {p50:.1f}ms p95 {p95:.1f}ms p99 {p99:.1f}ms"
+        print(line)
+    if windows:
+        print(f"Phase windows (from markers): {len(windows)}")
+    statuses, counts = np.unique(records["status"][ok], return_counts=True)
+    print("Status: " + ", ".join(f"{s}={c}" for s, c in zip(statuses, counts)))
+    classes, counts = np.unique(records["error"][~ok], return_counts=True)
+    if len(classes):
+        print("Errors: " + ", ".join(f"{ERROR_CLASSES.get(c, c)}={n}" for c, n in zip(classes, counts)))
+    if TRACE_PHASES[0] in records.dtype.names and ok.any():
+        # separa o custo de ligacao (ingress/Kourier) do tempo ate ao primeiro byte (Knative/pod)
+        print("Client-side request phases (successful requests):")
+        for name in TRACE_PHASES:
+            values = records[name][ok] * 1000
+            p50, p99 = np.percentile(values, [50, 99])
+            print(f"  {name:<8} mean {values.mean():.2f}ms p50 {p50:.2f}ms p99 {p99:.2f}ms")
+
+
+def write_csv(records, out):
+    traced = TRACE_PHASES[0] in records.dtype.names
+    out.write("timestamp,latency,status,error,phase" + "".join(f",{name}_ms" for name in TRACE_PHASES if traced) + "\n")
+    for ts_ns, latency, status, error, phase, *phases in records.tolist():
+        out.write(f"{datetime.fromtimestamp(ts_ns / 1e9).isoformat()},{latency:.3f},{status},"
+                  f"{ERROR_CLASSES.get(error, error)},{phase}"
+                  + "".join(f",{value * 1000:.3f}" for value in phases) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or export a binary request log")
+    parser.add_argument("path")
+    parser.add_argument("--csv", action="store_true", help="Write the records as CSV to stdout")
+    args = parser.parse_args()
+    records = read_records(args.path)
+    if args.csv:
+        write_csv(requests_only(records), sys.stdout)
+    else:
+        summarize(records)
+
+
+if __name__ == "__main__":
+    main()
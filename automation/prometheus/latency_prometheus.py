@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import os
+import requests
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from datetime import datetime, timedelta, timezone
+
+# User-configurable parameters
+PROM_HOST       = "10.255.32.113:31752"  # Prometheus host:port
+QUANTILES       = [0.5, 0.95, 0.99]
+# Latencia server-side exposta pelo /metrics do app4.py, por pod
+QUERY_TEMPLATE  = """
+histogram_quantile({q},
+  sum by (pod, le) (rate(fib_request_duration_seconds_bucket{{namespace="default",pod=~"knative-fn4-.*",path="/fib"}}[1m]))
+)
+"""
+END_TIME_STR    = "2025-04-18T01:49:52Z"
+DURATION_HOURS  = 13
+STEP            = "30s"
+
+# Output paths
+IMG_PATH        = "images/server_latency.png"
+DATA_DIR        = "data"
+DATA_TXT_PATH   = os.path.join(DATA_DIR, "server_latency.txt")
+
+# Ensure directories exist
+os.makedirs(os.path.dirname(IMG_PATH), exist_ok=True)
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Parse times
+end_time   = datetime.strptime(END_TIME_STR, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+start_time = end_time - timedelta(hours=DURATION_HOURS)
+
+url = f"http://{PROM_HOST}/api/v1/query_range"
+
+# series[(quantile, pod)] = (timestamps, values)
+series = {}
+for q in QUANTILES:
+    params = {
+        "query": QUERY_TEMPLATE.format(q=q),
+        "start": start_time.isoformat(),
+        "end":   end_time.isoformat(),
+        "step":  STEP
+    }
+    print(f"Requesting p{int(q * 100)} from {params['start']} to {params['end']}...")
+    resp = requests.get(url, params=params)
+    resp.raise_for_status()
+    for result in resp.json().get("data", {}).get("result", []):
+        pod = result["metric"].get("pod", "unknown")
+        timestamps, values = [], []
+        for ts, val in result["values"]:
+            if val == "NaN":
+                continue
+            timestamps.append(datetime.fromtimestamp(float(ts), tz=timezone.utc))
+            values.append(float(val) * 1000)
+        if timestamps:
+            series[(q, pod)] = (timestamps, values)
+
+if not series:
+    print("No data returned for the query.")
+    exit(1)
+
+# --- Dump to text file ---
+with open(DATA_TXT_PATH, "w") as f:
+    f.write("# Quantile\tPod\tTimestamp (UTC)\tLatency (ms)\n")
+    for (q, pod), (timestamps, values) in sorted(series.items()):
+        for t, v in zip(timestamps, values):
+            f.write(f"{q}\t{pod}\t{t.isoformat()}\t{v:.3f}\n")
+print(f"Raw data saved to {DATA_TXT_PATH}")
+
+# --- Plotting ---
+fig, axes = plt.subplots(len(QUANTILES), 1, figsize=(10, 3 * len(QUANTILES)), sharex=True)
+for ax, q in zip(axes, QUANTILES):
+    for (sq, pod), (timestamps, values) in sorted(series.items()):
+        if sq == q:
+            ax.plot(timestamps, values, linewidth=1, label=pod)
+    ax.set_ylabel(f"p{int(q * 100)} (ms)")
+    ax.grid(which='major', linestyle='--', alpha=0.5)
+
+axes[-1].xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+axes[-1].set_xlabel('Time')
+axes[0].set_title('knative-fn4 server-side /fib latency per pod')
+axes[0].legend(fontsize='small', loc='upper right')
+
+plt.setp(axes[-1].xaxis.get_majorticklabels(), rotation=45, ha='right')
+plt.tight_layout()
+plt.savefig(IMG_PATH)
+plt.close()
+
+print(f"Graph saved as {IMG_PATH}")
@@ -13,7 +13,7 @@ def main(filepath):
     with open(filepath, 'r') as f:
         for line in f:
             if not line.strip(): continue
-            ts_str, rt_str, _ = line.strip().split(',')
+            ts_str, rt_str, _ = line.strip().split(',')[:3]
             dt = datetime.fromisoformat(ts_str)
             times.append(dt)
             resp_times.append(float(rt_str))
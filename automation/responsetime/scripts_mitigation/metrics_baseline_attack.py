@@ -8,7 +8,7 @@ def analyze_response_log(file_path):
     with open(file_path, 'r') as f:
         for line in f:
             try:
-                timestamp, response_time, status_code = line.strip().split(',')
+                timestamp, response_time, status_code = line.strip().split(',')[:3]
                 response_time = float(response_time)
                 response_times.append(response_time)
                 status_counts[status_code] += 1
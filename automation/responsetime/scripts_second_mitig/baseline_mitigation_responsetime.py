@@ -16,7 +16,7 @@ def main(filepath):
             for line in f:
                 if not line.strip(): continue
                 try:
-                    ts_str, rt_str, _ = line.strip().split(',')
+                    ts_str, rt_str, _ = line.strip().split(',')[:3]
                     dt = datetime.fromisoformat(ts_str)
                     times.append(dt)
                     resp_times.append(float(rt_str))
@@ -0,0 +1,58 @@
+import statistics
+from collections import defaultdict
+
+# Pedidos servidos por pods com menos do que isto de uptime contam como "pod frio"
+COLD_POD_UPTIME_MS = 60000
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def analyze_server_timing(file_path):
+    """Split client latency into in-app phases and time spent outside the pod.
+
+    Expects lines written by the attack scripts:
+    timestamp,duration,HTTP status,pod,uptime_ms,admission_ms,pool_ms,compute_ms,serialize_ms,app_ms
+    """
+    phases = defaultdict(list)
+    cold = defaultdict(list)
+    pods = set()
+    skipped = 0
+
+    with open(file_path, 'r') as f:
+        for line in f:
+            parts = line.strip().split(',')
+            try:
+                client_ms = float(parts[1]) * 1000
+                pod, uptime_ms = parts[3], float(parts[4])
+                admission_ms, pool_ms, compute_ms, serialize_ms, app_ms = (float(p or 0) for p in parts[5:10])
+            except (ValueError, IndexError):
+                skipped += 1
+                continue
+            pods.add(pod)
+            row = {
+                "client": client_ms,
+                "outside pod (ingress/activator/queue-proxy)": max(client_ms - app_ms, 0.0),
+                "admission wait": admission_ms,
+                "pool queue": pool_ms,
+                "compute": compute_ms,
+                "serialize": serialize_ms,
+            }
+            target = cold if uptime_ms < COLD_POD_UPTIME_MS else phases
+            for name, value in row.items():
+                target[name].append(value)
+
+    print(f"Pods seen: {len(pods)} | lines without Server-Timing: {skipped}")
+    for label, data in (("Warm pods", phases), (f"Cold pods (uptime < {COLD_POD_UPTIME_MS / 1000:.0f}s)", cold)):
+        if not data:
+            continue
+        print(f"\n{label}: {len(data['client'])} requests")
+        print(f"{'phase':<45}{'mean ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, values in data.items():
+            print(f"{name:<45}{statistics.mean(values):>10.2f}{percentile(values, 0.95):>10.2f}{percentile(values, 0.99):>10.2f}")
+
+
+# Mudar o nome do ficheiro aqui:
+analyze_server_timing('attack_metrics.log')
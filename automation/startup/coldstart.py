@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+coldstart.py
+
+Mede localmente o tempo desde o spawn do servico ate ao primeiro HTTP 200
+(o mesmo caminho que um pedido paga num scale-from-zero do Knative) e o RSS
+do processo logo a seguir.
+
+Usage:
+    python automation/startup/coldstart.py --runs 10 --max-ms 1500
+    LEAN=1 python automation/startup/coldstart.py --max-rss-mb 60
+    python automation/startup/coldstart.py --cmd "uvicorn app4:app --port {port}"
+"""
+
+import argparse
+import os
+import shlex
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_CMD = f"{shlex.quote(sys.executable)} serve.py"
+PROBE_PATH = "/fib"
+READY_PATH = "/healthz/ready"
+POLL_INTERVAL = 0.005          # Segundos entre tentativas
+SPAWN_TIMEOUT = 30             # Desiste de uma execucao ao fim deste tempo
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def get_status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def measure_once(cmd, importtime):
+    """Spawn the service and return (ms to ready, ms to first 200, RSS MiB after it, stderr)."""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), HOST="127.0.0.1")
+    args = shlex.split(cmd.format(port=port))
+    if importtime and os.path.basename(args[0]).startswith("python"):
+        args = [args[0], "-X", "importtime"] + args[1:]
+
+    base_url = f"http://127.0.0.1:{port}"
+    ready_ms = first_ok_ms = rss = None
+    start = time.perf_counter()
+    proc = subprocess.Popen(args, cwd=REPO_ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    try:
+        while time.perf_counter() - start < SPAWN_TIMEOUT:
+            if proc.poll() is not None:
+                break
+            if ready_ms is None and get_status(base_url + READY_PATH) == 200:
+                ready_ms = (time.perf_counter() - start) * 1000
+            if get_status(base_url + PROBE_PATH) == 200:
+                first_ok_ms = (time.perf_counter() - start) * 1000
+                rss = rss_mb(proc.pid)
+                break
+            time.sleep(POLL_INTERVAL)
+    finally:
+        proc.terminate()
+        try:
+            _, stderr = proc.communicate(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            _, stderr = proc.communicate()
+    return ready_ms, first_ok_ms, rss, stderr
+
+
+def top_imports(stderr, limit=15):
+    """Parse `-X importtime` output and return the slowest cumulative imports."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spawn-to-first-200 cold start harness")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="Comando a lancar; {port} e substituido")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Falha (exit 1) se a mediana ate ao primeiro 200 exceder este valor")
+    parser.add_argument("--max-rss-mb", type=float, default=None,
+                        help="Falha (exit 1) se o RSS mediano apos o primeiro 200 exceder este valor")
+    parser.add_argument("--importtime", action="store_true", help="Mostra os imports mais lentos da ultima execucao")
+    args = parser.parse_args()
+
+    first_ok, ready, rss, stderr = [], [], [], ""
+    for i in range(args.runs):
+        ready_ms, first_ok_ms, rss_after, stderr = measure_once(args.cmd, args.importtime)
+        if first_ok_ms is None:
+            print(f"Run {i + 1}: no HTTP 200 within {SPAWN_TIMEOUT}s")
+            print(stderr[-2000:])
+            sys.exit(1)
+        first_ok.append(first_ok_ms)
+        if ready_ms is not None:
+            ready.append(ready_ms)
+        if rss_after is not None:
+            rss.append(rss_after)
+        rss_text = f" | RSS {rss_after:.1f} MiB" if rss_after is not None else ""
+        print(f"Run {i + 1}: first 200 after {first_ok_ms:.1f} ms{rss_text}")
+
+    print(f"\nSpawn-to-first-200 over {len(first_ok)} runs: "
+          f"min {min(first_ok):.1f} ms | median {statistics.median(first_ok):.1f} ms | max {max(first_ok):.1f} ms")
+    if ready:
+        print(f"Spawn-to-ready median: {statistics.median(ready):.1f} ms")
+    if rss:
+        print(f"RSS after first 200 median: {statistics.median(rss):.1f} MiB")
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative):")
+        for cumulative_us, name in top_imports(stderr):
+            print(f"{cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if args.max_ms is not None and statistics.median(first_ok) > args.max_ms:
+        print(f"\nREGRESSION: median {statistics.median(first_ok):.1f} ms exceeds budget {args.max_ms:.1f} ms")
+        failed = True
+    if args.max_rss_mb is not None and rss and statistics.median(rss) > args.max_rss_mb:
+        print(f"\nREGRESSION: median RSS {statistics.median(rss):.1f} MiB exceeds budget {args.max_rss_mb:.1f} MiB")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
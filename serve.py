@@ -0,0 +1,81 @@
+import asyncio
+import os
+import time
+import uvicorn
+
+# Modo de arranque rapido do app4: escolhe uvloop/httptools quando instalados,
+# evita o parsing da CLI do uvicorn e desliga o access log por omissao.
+
+# Configuration
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8080"))                # O Knative injeta PORT no container
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "warning")
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "0") == "1"
+WORKERS = int(os.environ.get("WORKERS", "1"))                          # >1: varios processos uvicorn (usar com SHARED_CACHE_SLOTS)
+DRAIN_GRACE_SEC = float(os.environ.get("DRAIN_GRACE_SEC", "3"))       # Continua a aceitar pedidos apos o SIGTERM enquanto o pod sai do routing
+DRAIN_TIMEOUT_SEC = float(os.environ.get("DRAIN_TIMEOUT_SEC", "30"))  # Orcamento para terminar os pedidos em curso
+
+
+def _available(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains on SIGTERM instead of closing the listener at once.
+
+    The first signal marks the app as draining (readiness turns 503) and keeps
+    serving for DRAIN_GRACE_SEC; then uvicorn's normal shutdown stops accepting
+    connections and waits up to DRAIN_TIMEOUT_SEC for in-flight requests.
+    A second signal skips the grace period.
+    """
+
+    loop = None
+    drain_started = None
+
+    async def serve(self, sockets=None):
+        self.loop = asyncio.get_running_loop()
+        await super().serve(sockets)
+
+    def handle_exit(self, sig, frame):
+        if self.drain_started is not None or self.loop is None:
+            super().handle_exit(sig, frame)
+            return
+        self.drain_started = time.monotonic()
+        # Estamos dentro de um signal handler: so call_soon_threadsafe e seguro aqui
+        self.loop.call_soon_threadsafe(self._begin_drain, sig, frame)
+
+    def _begin_drain(self, sig, frame):
+        import app4
+
+        app4.app.state.draining = True
+        app4.app.state.drain_started = self.drain_started
+        print(f"[DRAIN] signal {sig}: {app4.app.state.in_flight} requests in flight, "
+              f"grace {DRAIN_GRACE_SEC}s, budget {DRAIN_TIMEOUT_SEC}s", flush=True)
+        self.loop.call_later(DRAIN_GRACE_SEC, super().handle_exit, sig, frame)
+
+
+def main():
+    options = dict(
+        host=HOST,
+        port=PORT,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        log_level=LOG_LEVEL,
+        access_log=ACCESS_LOG,
+        lifespan="on",
+        timeout_graceful_shutdown=DRAIN_TIMEOUT_SEC,
+    )
+    if WORKERS > 1:
+        # O supervisor multi-processo do uvicorn cria os seus proprios Server: cada
+        # worker termina os pedidos em curso (DRAIN_TIMEOUT_SEC), mas sem o periodo de graca
+        uvicorn.run("app4:app", workers=WORKERS, **options)
+        return
+    DrainingServer(uvicorn.Config("app4:app", **options)).run()
+
+
+if __name__ == "__main__":
+    main()